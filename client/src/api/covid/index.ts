@@ -6,6 +6,7 @@ export type {
   StateSummary,
   TrendData,
   FilterOptions,
+  FacetCounts,
   CovidSearchParams,
   TrendFilters,
 } from "./interfaces";
@@ -69,6 +69,18 @@ export interface FilterOptions {
   };
 }
 
+export interface FacetCounts {
+  total_records: number;
+  facets: {
+    state: Record<string, number>;
+    season: Record<string, number>;
+    age_category: Record<string, number>;
+    sex: Record<string, number>;
+    race: Record<string, number>;
+  };
+  filters?: TrendFilters;
+}
+
 export interface CovidSearchParams {
   page?: number;
   per_page?: number;
@@ -12,6 +12,7 @@ import type {
   StateSummary,
   TrendData,
   FilterOptions,
+  FacetCounts,
   CovidSearchParams,
   TrendFilters,
 } from "./interfaces";
@@ -213,6 +214,31 @@ export const useCovid = () => {
       }
     }, []);
 
+  const getFacets = useCallback(
+    async (filters: TrendFilters = {}): Promise<FacetCounts | null> => {
+      try {
+        const searchParams = new URLSearchParams();
+
+        // Add all possible filter parameters
+        Object.entries(filters).forEach(([key, value]) => {
+          if (value !== undefined && value !== null && value !== "") {
+            searchParams.append(key, value.toString());
+          }
+        });
+
+        const response = await api.get<FacetCounts>(
+          `/covid/facets?${searchParams.toString()}`
+        );
+        return response.data;
+      } catch (err) {
+        // Counts are advisory; the filters keep working without them
+        console.error("Error fetching facet counts:", err);
+        return null;
+      }
+    },
+    []
+  );
+
   const checkHealth = useCallback(async (): Promise<boolean> => {
     try {
       await api.get("/covid/health");
@@ -263,6 +289,7 @@ export const useCovid = () => {
     getAllRecords,
     advancedSearch,
     getFilterOptions,
+    getFacets,
     checkHealth,
 
     // Utility functions
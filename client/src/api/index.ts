@@ -6,6 +6,7 @@ export {
   type StateSummary,
   type TrendData,
   type FilterOptions,
+  type FacetCounts,
   type CovidSearchParams,
   type TrendFilters,
 } from "./covid";
@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { useCovid } from "../../api";
-import type { CovidSearchParams } from "../../api";
+import type { CovidSearchParams, FacetCounts } from "../../api";
 import "./AdvancedFilters.css";
 
 interface AdvancedFiltersProps {
@@ -8,11 +8,25 @@ interface AdvancedFiltersProps {
   initialFilters?: CovidSearchParams;
 }
 
+// Wait for typing in the rate and date inputs to settle before recounting
+const FACETS_DEBOUNCE_MS = 250;
+
+// Remove empty values before sending
+const getCleanFilters = (values: CovidSearchParams): CovidSearchParams => {
+  const cleanFilters: CovidSearchParams = {};
+  Object.entries(values).forEach(([k, v]) => {
+    if (v !== "" && v !== undefined && v !== null) {
+      (cleanFilters as any)[k] = v;
+    }
+  });
+  return cleanFilters;
+};
+
 export const AdvancedFilters = ({
   onFiltersChange,
   initialFilters,
 }: AdvancedFiltersProps) => {
-  const { getFilterOptions } = useCovid();
+  const { getFilterOptions, getFacets } = useCovid();
 
   const [filterOptions, setFilterOptions] = useState<{
     states: string[];
@@ -22,6 +36,8 @@ export const AdvancedFilters = ({
     race: string[];
   } | null>(null);
 
+  const [facets, setFacets] = useState<FacetCounts["facets"] | null>(null);
+
   const [filters, setFilters] = useState<CovidSearchParams>({
     state: initialFilters?.state || "",
     season: initialFilters?.season || "",
@@ -51,6 +67,38 @@ export const AdvancedFilters = ({
     loadFilterOptions();
   }, [getFilterOptions]);
 
+  // Refresh the per-option match counts once the selection stops changing
+  useEffect(() => {
+    let ignore = false;
+
+    const loadFacets = async () => {
+      const result = await getFacets(getCleanFilters(filters));
+      if (!ignore) {
+        setFacets(result ? result.facets : null);
+      }
+    };
+
+    const timer = setTimeout(loadFacets, FACETS_DEBOUNCE_MS);
+    return () => {
+      ignore = true;
+      clearTimeout(timer);
+    };
+  }, [getFacets, filters]);
+
+  // Options that would return no rows are disabled unless already selected
+  const renderOption = (key: keyof FacetCounts["facets"], value: string) => {
+    const count = facets?.[key][value];
+    return (
+      <option
+        key={value}
+        value={value}
+        disabled={count === 0 && filters[key] !== value}
+      >
+        {count === undefined ? value : `${value} (${count.toLocaleString()})`}
+      </option>
+    );
+  };
+
   const handleFilterChange = (
     key: keyof CovidSearchParams,
     value: string | number | undefined
@@ -58,15 +106,7 @@ export const AdvancedFilters = ({
     const newFilters = { ...filters, [key]: value };
     setFilters(newFilters);
 
-    // Remove empty values before sending
-    const cleanFilters: CovidSearchParams = {};
-    Object.entries(newFilters).forEach(([k, v]) => {
-      if (v !== "" && v !== undefined && v !== null) {
-        (cleanFilters as any)[k] = v;
-      }
-    });
-
-    onFiltersChange(cleanFilters);
+    onFiltersChange(getCleanFilters(newFilters));
   };
 
   const handleReset = () => {
@@ -107,11 +147,7 @@ export const AdvancedFilters = ({
             className="filter-select"
           >
             <option value="">All States</option>
-            {filterOptions?.states.map((state) => (
-              <option key={state} value={state}>
-                {state}
-              </option>
-            ))}
+            {filterOptions?.states.map((state) => renderOption("state", state))}
           </select>
         </div>
 
@@ -124,11 +160,9 @@ export const AdvancedFilters = ({
             className="filter-select"
           >
             <option value="">All Seasons</option>
-            {filterOptions?.seasons.map((season) => (
-              <option key={season} value={season}>
-                {season}
-              </option>
-            ))}
+            {filterOptions?.seasons.map((season) =>
+              renderOption("season", season)
+            )}
           </select>
         </div>
 
@@ -171,11 +205,7 @@ export const AdvancedFilters = ({
             <option value="">All Ages</option>
             {filterOptions?.age_categories
               .filter((age) => age.toLowerCase() !== "all")
-              .map((age) => (
-                <option key={age} value={age}>
-                  {age}
-                </option>
-              ))}
+              .map((age) => renderOption("age_category", age))}
           </select>
         </div>
 
@@ -190,11 +220,7 @@ export const AdvancedFilters = ({
             <option value="">All</option>
             {filterOptions?.sex
               .filter((sexValue) => sexValue.toLowerCase() !== "all")
-              .map((sexValue) => (
-                <option key={sexValue} value={sexValue}>
-                  {sexValue}
-                </option>
-              ))}
+              .map((sexValue) => renderOption("sex", sexValue))}
           </select>
         </div>
 
@@ -209,11 +235,7 @@ export const AdvancedFilters = ({
             <option value="">All</option>
             {filterOptions?.race
               .filter((raceValue) => raceValue.toLowerCase() !== "all")
-              .map((raceValue) => (
-                <option key={raceValue} value={raceValue}>
-                  {raceValue}
-                </option>
-              ))}
+              .map((raceValue) => renderOption("race", raceValue))}
           </select>
         </div>
       </div>
@@ -1,9 +1,10 @@
+import multiprocessing
 import os
 from flask import Flask, jsonify
 from flask_cors import CORS
-from app.routes.covid import covid_bp
+from app.routes.covid import covid_bp, covid_service
 
-def create_app():
+def create_app(warm_up: bool = True):
     app = Flask(__name__)
     
     CORS(app)
@@ -14,4 +15,9 @@ def create_app():
     def health():
         return jsonify({"status": "ok"})
     
+    # Load data and fill hot caches in the background so probes stay cheap.
+    # Parallel query workers re-import the entry module and must not load data.
+    if warm_up and os.getenv('COVID_WARM_UP', '1') != '0' and multiprocessing.parent_process() is None:
+        covid_service.start_warm_up()
+    
     return app
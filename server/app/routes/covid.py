@@ -1,19 +1,126 @@
-from flask import Blueprint, request, jsonify
+from functools import wraps
+from flask import Blueprint, current_app, request, jsonify
 from app.services.covid_service import CovidService
+from app.utils.admission import AdmissionController, AdmissionRejected
+from app.utils.record_encoding import parse_fields, parse_format, shape_records
+from app.utils.single_flight import SingleFlight
 
 covid_bp = Blueprint('covid', __name__, url_prefix='/api/covid')
 covid_service = CovidService()
+admission = AdmissionController.from_env()
+# Identical bulk requests running at the same time share one encoded body
+response_bodies = SingleFlight()
+
+
+def admission_controlled(endpoint_class, estimate=None):
+    """Shed requests that exceed the endpoint class budget or the client's rate.
+    
+    estimate receives the view's arguments and returns a QueryCost (or None);
+    it runs before the view so expensive queries are rejected up front.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                ticket = _admit(endpoint_class, estimate, *args, **kwargs)
+            except AdmissionRejected as e:
+                return _rejection_response(e)
+            
+            with ticket:
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _admit(endpoint_class, estimate=None, *args, **kwargs):
+    """Admit the current request or raise AdmissionRejected"""
+    cost = None
+    if estimate is not None:
+        try:
+            cost = estimate(*args, **kwargs)
+        except ValueError:
+            pass  # The view itself reports invalid parameters
+    
+    return admission.acquire(endpoint_class, _client_id(), cost)
+
+
+def _client_id():
+    """The client the current request is charged to"""
+    if admission.client_id_header:
+        # A proxy appends the address it saw, so the last entry is the trusted one
+        forwarded = request.headers.get(admission.client_id_header, '')
+        client = forwarded.rsplit(',', 1)[-1].strip()
+        if client:
+            return client
+    return request.remote_addr or 'unknown'
+
+
+def _rejection_response(e):
+    response = jsonify({"error": e.reason})
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def _get_page_size():
+    """Read per_page from the current request, capped at 100"""
+    return min(int(request.args.get('per_page', 50)), 100)
+
+
+def _get_filter_params():
+    """Read the shared filter query parameters from the current request"""
+    min_rate = request.args.get('min_rate')
+    max_rate = request.args.get('max_rate')
+    
+    return {
+        'state': request.args.get('state'),
+        'season': request.args.get('season'),
+        'age_category': request.args.get('age_category'),
+        'sex': request.args.get('sex'),
+        'race': request.args.get('race'),
+        # Rate range filters
+        'min_rate': float(min_rate) if min_rate else None,
+        'max_rate': float(max_rate) if max_rate else None,
+        # Date range filters
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date')
+    }
+
+
+def _get_fields():
+    """Read the fields= projection from the current request (None = all fields)"""
+    return parse_fields(request.args.get('fields'))
+
+
+def _get_response_format():
+    """Read format= from the current request: 'records' (default) or 'compact'"""
+    return parse_format(request.args.get('format'))
+
+
+def _explain_requested():
+    """Whether the client asked for the query plan (?explain=true)"""
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+
+def _shared_json(key, build):
+    """Respond with the JSON body from build(), run once for identical concurrent requests"""
+    body = response_bodies.do(key, build)
+    return current_app.response_class(body, mimetype='application/json')
 
 
 @covid_bp.route('', methods=['GET'])
+@admission_controlled('search', lambda: covid_service.estimate_query_cost(
+    'page', _get_page_size(), _get_fields()))
 def get_covid_data():
     """Get COVID-19 hospitalization data with pagination and sorting"""
     try:
         # Get query parameters
         page = int(request.args.get('page', 1))
-        per_page = min(int(request.args.get('per_page', 50)), 100)  # Max 100 per page
+        per_page = _get_page_size()  # Max 100 per page
         sort_by = request.args.get('sort_by', 'date')
         sort_order = request.args.get('sort_order', 'desc')
+        fields = _get_fields()
+        response_format = _get_response_format()
         
         result = covid_service.get_all_records(
             page=page,
@@ -21,6 +128,7 @@ def get_covid_data():
             sort_by=sort_by,
             sort_order=sort_order
         )
+        result['data'] = shape_records(result['data'], fields, response_format)
         
         return jsonify(result), 200
     except ValueError as e:
@@ -30,14 +138,18 @@ def get_covid_data():
 
 
 @covid_bp.route('/state/<state>', methods=['GET'])
+@admission_controlled('search', lambda state: covid_service.estimate_query_cost(
+    'page', _get_page_size(), _get_fields(), state_contains=state))
 def get_state_data(state):
     """Get COVID-19 data for a specific state"""
     try:
         # Get query parameters
         page = int(request.args.get('page', 1))
-        per_page = min(int(request.args.get('per_page', 50)), 100)
+        per_page = _get_page_size()
         sort_by = request.args.get('sort_by', 'date')
         sort_order = request.args.get('sort_order', 'desc')
+        fields = _get_fields()
+        response_format = _get_response_format()
         
         result = covid_service.search_by_state(
             state=state,
@@ -46,6 +158,9 @@ def get_state_data(state):
             sort_by=sort_by,
             sort_order=sort_order
         )
+        result['data'] = shape_records(result['data'], fields, response_format)
+        if _explain_requested():
+            result['explain'] = covid_service.explain_query(state_contains=state)
         
         return jsonify(result), 200
     except ValueError as e:
@@ -55,6 +170,7 @@ def get_state_data(state):
 
 
 @covid_bp.route('/state/<state>/summary', methods=['GET'])
+@admission_controlled('cheap')
 def get_state_summary(state):
     """Get summary statistics for a specific state"""
     try:
@@ -69,55 +185,22 @@ def get_state_summary(state):
 
 
 @covid_bp.route('/trends', methods=['GET'])
+@admission_controlled('search', lambda: covid_service.estimate_query_cost('trends', **_get_filter_params()))
 def get_trends():
     """Get trends over time with optional filters"""
     try:
-        # Get all possible filter parameters (same as advanced search)
-        state = request.args.get('state')
-        season = request.args.get('season')
-        age_category = request.args.get('age_category')
-        sex = request.args.get('sex')
-        race = request.args.get('race')
-        
-        # Rate range filters
-        min_rate = request.args.get('min_rate')
-        max_rate = request.args.get('max_rate')
-        
-        if min_rate:
-            min_rate = float(min_rate)
-        if max_rate:
-            max_rate = float(max_rate)
+        filters = _get_filter_params()
         
-        # Date range filters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        result = covid_service.get_trends_over_time(
-            state=state,
-            season=season,
-            age_category=age_category,
-            sex=sex,
-            race=race,
-            min_rate=min_rate,
-            max_rate=max_rate,
-            start_date=start_date,
-            end_date=end_date
-        )
+        result = covid_service.get_trends_over_time(**filters)
         
-        return jsonify({
+        response = {
             'data': result,
-            'filters': {
-                'state': state,
-                'season': season,
-                'age_category': age_category,
-                'sex': sex,
-                'race': race,
-                'min_rate': min_rate,
-                'max_rate': max_rate,
-                'start_date': start_date,
-                'end_date': end_date
-            }
-        }), 200
+            'filters': filters
+        }
+        if _explain_requested():
+            response['explain'] = covid_service.explain_query(**filters)
+        
+        return jsonify(response), 200
     except ValueError as e:
         return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
     except Exception as e:
@@ -125,50 +208,31 @@ def get_trends():
 
 
 @covid_bp.route('/search', methods=['GET'])
+@admission_controlled('search', lambda: covid_service.estimate_query_cost(
+    'page', _get_page_size(), _get_fields(), **_get_filter_params()))
 def advanced_search():
     """Advanced search with multiple filters"""
     try:
-        # Get all possible filter parameters
-        state = request.args.get('state')
-        season = request.args.get('season')
-        age_category = request.args.get('age_category')
-        sex = request.args.get('sex')
-        race = request.args.get('race')
-        
-        # Rate range filters
-        min_rate = request.args.get('min_rate')
-        max_rate = request.args.get('max_rate')
-        
-        if min_rate:
-            min_rate = float(min_rate)
-        if max_rate:
-            max_rate = float(max_rate)
-        
-        # Date range filters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        filters = _get_filter_params()
         
         # Pagination and sorting
         page = int(request.args.get('page', 1))
-        per_page = min(int(request.args.get('per_page', 50)), 100)
+        per_page = _get_page_size()
         sort_by = request.args.get('sort_by', 'date')
         sort_order = request.args.get('sort_order', 'desc')
+        fields = _get_fields()
+        response_format = _get_response_format()
         
         result = covid_service.advanced_search(
-            state=state,
-            season=season,
-            age_category=age_category,
-            sex=sex,
-            race=race,
-            min_rate=min_rate,
-            max_rate=max_rate,
-            start_date=start_date,
-            end_date=end_date,
+            **filters,
             page=page,
             per_page=per_page,
             sort_by=sort_by,
             sort_order=sort_order
         )
+        result['data'] = shape_records(result['data'], fields, response_format)
+        if _explain_requested():
+            result['explain'] = covid_service.explain_query(**filters)
         
         return jsonify(result), 200
     except ValueError as e:
@@ -178,6 +242,7 @@ def advanced_search():
 
 
 @covid_bp.route('/filters', methods=['GET'])
+@admission_controlled('cheap')
 def get_filter_options():
     """Get available filter options"""
     try:
@@ -187,58 +252,61 @@ def get_filter_options():
         return jsonify({"error": str(e)}), 500
 
 
-@covid_bp.route('/all-records', methods=['GET'])
-def get_all_records_no_pagination():
-    """Get ALL COVID-19 data without pagination for aggregation purposes"""
+@covid_bp.route('/facets', methods=['GET'])
+@admission_controlled('search', lambda: covid_service.estimate_query_cost('facets', **_get_filter_params()))
+def get_facet_counts():
+    """Get matching row counts per filter value for the current filter set"""
     try:
-        # Get all possible filter parameters (same as advanced search)
-        state = request.args.get('state')
-        season = request.args.get('season')
-        age_category = request.args.get('age_category')
-        sex = request.args.get('sex')
-        race = request.args.get('race')
+        filters = _get_filter_params()
         
-        # Rate range filters
-        min_rate = request.args.get('min_rate')
-        max_rate = request.args.get('max_rate')
+        result = covid_service.get_facet_counts(**filters)
         
-        if min_rate:
-            min_rate = float(min_rate)
-        if max_rate:
-            max_rate = float(max_rate)
+        response = {
+            'total_records': result['total_records'],
+            'facets': result['facets'],
+            'filters': filters
+        }
+        if _explain_requested():
+            response['explain'] = covid_service.explain_query(**filters)
         
-        # Date range filters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@covid_bp.route('/all-records', methods=['GET'])
+def get_all_records_no_pagination():
+    """Get ALL COVID-19 data without pagination for aggregation purposes"""
+    try:
+        filters = _get_filter_params()
+        fields = _get_fields()
+        response_format = _get_response_format()
+        explain = _explain_requested()
         
-        # Get ALL records without pagination
-        result = covid_service.get_all_records_no_pagination(
-            state=state,
-            season=season,
-            age_category=age_category,
-            sex=sex,
-            race=race,
-            min_rate=min_rate,
-            max_rate=max_rate,
-            start_date=start_date,
-            end_date=end_date
-        )
+        def build():
+            # Only the request that builds the body is admitted; identical requests
+            # arriving meanwhile wait for it without taking bulk budget of their own
+            estimate = lambda: covid_service.estimate_query_cost('records', fields=fields, **filters)
+            with _admit('bulk', estimate):
+                # Get ALL records without pagination
+                result = covid_service.get_all_records_no_pagination(**filters)
+                
+                response = {
+                    'data': shape_records(result, fields, response_format),
+                    'total_records': len(result),
+                    'filters': filters
+                }
+                if explain:
+                    response['explain'] = covid_service.explain_query(**filters)
+                return jsonify(response).get_data()
         
-        return jsonify({
-            'data': result,
-            'total_records': len(result),
-            'filters': {
-                'state': state,
-                'season': season,
-                'age_category': age_category,
-                'sex': sex,
-                'race': race,
-                'min_rate': min_rate,
-                'max_rate': max_rate,
-                'start_date': start_date,
-                'end_date': end_date
-            }
-        }), 200
+        # Encoding the records costs more than the query, so share it as well
+        key = ('all_records', tuple(filters.items()), fields, response_format, explain)
+        return _shared_json(key, build), 200
+    except AdmissionRejected as e:
+        return _rejection_response(e)
     except ValueError as e:
         return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
     except Exception as e:
@@ -248,17 +316,37 @@ def get_all_records_no_pagination():
 @covid_bp.route('/health', methods=['GET'])
 def covid_health_check():
     """Health check for COVID data service"""
-    try:
-        # Try to load a small sample of data to verify the service is working
-        result = covid_service.get_all_records(page=1, per_page=1)
-        
-        return jsonify({
-            "status": "ok",
-            "message": "COVID-19 data service is operational",
-            "total_records": result['pagination']['total_records']
-        }), 200
-    except Exception as e:
+    # Reports load state only; never triggers a load or runs a query
+    status = covid_service.get_readiness()
+    
+    if status['phase'] == 'error':
         return jsonify({
             "status": "error",
-            "message": f"COVID-19 data service error: {str(e)}"
+            "message": f"COVID-19 data service error: {status['error']}"
         }), 500
+    
+    if not status['ready']:
+        return jsonify({
+            "status": "loading",
+            "message": f"COVID-19 data service is {status['phase']}",
+            "progress": status['progress']
+        }), 503
+    
+    return jsonify({
+        "status": "ok",
+        "message": "COVID-19 data service is operational",
+        "total_records": status['total_records']
+    }), 200
+
+
+@covid_bp.route('/live', methods=['GET'])
+def covid_liveness_check():
+    """Liveness probe - the process is up and serving requests"""
+    return jsonify({"status": "ok"}), 200
+
+
+@covid_bp.route('/ready', methods=['GET'])
+def covid_readiness_check():
+    """Readiness probe - data is loaded, indexed and hot caches are filled"""
+    status = covid_service.get_readiness()
+    return jsonify(status), 200 if status['ready'] else 503
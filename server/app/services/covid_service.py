@@ -1,15 +1,90 @@
 import os
-from typing import List, Dict, Any, Optional
-from app.utils.covid_data_parser import CovidDataParser
+import threading
+import time
+from typing import List, Dict, Any, Optional, Sequence
+from app.storage import StorageBackend, create_backend
+from app.utils.admission import QueryCost
+from app.utils.record_encoding import projected_fraction
+from app.utils.result_cache import ResultCache
+from app.utils.single_flight import SingleFlight
+
+# Approximate serialized size of one aggregated trend row
+TREND_ROW_BYTES = 160
+
+# Approximate serialized size of one facet value and its count
+FACET_VALUE_BYTES = 40
+
+# Delay before retrying a failed warm-up, doubled after each failure up to the maximum
+WARM_UP_RETRY_SECONDS = 1.0
+WARM_UP_RETRY_MAX_SECONDS = 60.0
 
 
 class CovidService:
     """Service for COVID-19 hospitalization data operations"""
     
-    def __init__(self, data_file_path: str = None):
-        if data_file_path is None:
-            data_file_path = os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json')
-        self.data_parser = CovidDataParser(data_file_path)
+    def __init__(self, data_file_path: str = None, backend: Optional[StorageBackend] = None):
+        if backend is None:
+            if data_file_path is None:
+                data_file_path = os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json')
+            backend = create_backend(data_file_path)
+        self.backend = backend
+        # Identical queries running at the same time share one computation
+        self._in_flight = SingleFlight()
+        # Results over the immutable dataset (filter options, trends)
+        self._results = ResultCache(int(os.getenv('COVID_RESULT_CACHE_SIZE', 128)))
+        
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._warmed_up = False
+        self._warm_up_error: Optional[str] = None
+    
+    def start_warm_up(self) -> threading.Thread:
+        """Start loading data and pre-filling hot caches in a background thread"""
+        
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(
+                target=self._run_warm_up, name='covid-warm-up', daemon=True
+            )
+            self._warm_up_thread.start()
+        
+        return self._warm_up_thread
+    
+    def warm_up(self) -> None:
+        """Load and index the dataset, then pre-fill the hot query caches"""
+        
+        self.backend.load()
+        self.get_filter_options()
+        self.get_trends_over_time()
+        self._warm_up_error = None
+        self._warmed_up = True
+    
+    def _run_warm_up(self) -> None:
+        # Keep retrying so the service recovers once the data becomes available
+        delay = WARM_UP_RETRY_SECONDS
+        while True:
+            try:
+                self.warm_up()
+                return
+            except Exception as e:
+                self._warm_up_error = str(e)
+                print(f"COVID data warm-up failed, retrying in {delay:g}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, WARM_UP_RETRY_MAX_SECONDS)
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Report load phase, progress and data version without running queries"""
+        
+        status = self.backend.get_load_status()
+        
+        # The backend reports its own load errors; once it is loaded, a running
+        # warm-up (possibly retrying a failure) is still filling the caches.
+        # Without a warm-up, readiness is the backend's alone.
+        thread = self._warm_up_thread
+        if status['phase'] == 'ready' and not self._warmed_up and thread is not None and thread.is_alive():
+            status['phase'] = 'warming'
+            status['error'] = self._warm_up_error
+        
+        status['ready'] = status['phase'] == 'ready'
+        return status
     
     def get_all_records(self, 
                        page: int = 1, 
@@ -18,16 +93,12 @@ class CovidService:
                        sort_order: str = 'desc') -> Dict[str, Any]:
         """Get all records with pagination and sorting"""
         
-        data = self.data_parser.parse_data()
-        
-        # Apply sorting
-        data = self._sort_data(data, sort_by, sort_order)
-        
-        # Apply pagination
-        total_records = len(data)
+        # Apply sorting and pagination
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        paginated_data = data[start_idx:end_idx]
+        paginated_data, total_records = self.backend.search(
+            sort_by=sort_by, sort_order=sort_order, offset=start_idx, limit=per_page
+        )
         
         return {
             'data': paginated_data,
@@ -49,22 +120,13 @@ class CovidService:
                        sort_order: str = 'desc') -> Dict[str, Any]:
         """Get records filtered by state"""
         
-        data = self.data_parser.parse_data()
-        
-        # Filter by state (case-insensitive)
-        filtered_data = [
-            record for record in data 
-            if record['state'] and state.lower() in record['state'].lower()
-        ]
-        
-        # Apply sorting
-        filtered_data = self._sort_data(filtered_data, sort_by, sort_order)
-        
-        # Apply pagination
-        total_records = len(filtered_data)
+        # Filter by state (case-insensitive substring match), then sort and paginate
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        paginated_data = filtered_data[start_idx:end_idx]
+        paginated_data, total_records = self.backend.search(
+            sort_by=sort_by, sort_order=sort_order, offset=start_idx, limit=per_page,
+            state_contains=state
+        )
         
         return {
             'data': paginated_data,
@@ -82,34 +144,11 @@ class CovidService:
     def get_state_summary(self, state: str) -> Dict[str, Any]:
         """Get summary statistics for a specific state"""
         
-        data = self.data_parser.parse_data()
+        summary = self.backend.state_summary(state)
         
-        # Filter by exact state match
-        state_data = [
-            record for record in data 
-            if record['state'] and record['state'].lower() == state.lower()
-        ]
-        
-        if not state_data:
+        if summary is None:
             return {'error': 'State not found'}
         
-        # Calculate summary statistics
-        rates = [record['monthly_rate'] for record in state_data if record['monthly_rate'] is not None]
-        
-        summary = {
-            'state': state,
-            'total_records': len(state_data),
-            'date_range': self._get_date_range(state_data),
-            'statistics': {
-                'avg_rate': sum(rates) / len(rates) if rates else 0,
-                'max_rate': max(rates) if rates else 0,
-                'min_rate': min(rates) if rates else 0,
-                'total_months': len(set(record['year_month'] for record in state_data))
-            },
-            'seasons': list(set(record['season'] for record in state_data if record['season'])),
-            'age_categories': list(set(record['age_category'] for record in state_data if record['age_category']))
-        }
-        
         return summary
     
     def get_trends_over_time(self, 
@@ -124,68 +163,40 @@ class CovidService:
                            end_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get trends over time with optional filters - uses ALL records without pagination"""
         
-        # Use the new get_all_records_no_pagination method to get ALL filtered records
-        filtered_data = self.get_all_records_no_pagination(
-            state=state,
-            season=season,
-            age_category=age_category,
-            sex=sex,
-            race=race,
-            min_rate=min_rate,
-            max_rate=max_rate,
-            start_date=start_date,
-            end_date=end_date
-        )
+        filters = dict(state=state, season=season, age_category=age_category, sex=sex, race=race,
+                       min_rate=min_rate, max_rate=max_rate, start_date=start_date, end_date=end_date)
         
-        # Group by year-month and calculate averages
-        trends = {}
-        for record in filtered_data:
-            key = record['year_month']
-            if key not in trends:
-                trends[key] = {
-                    'year_month': key,
-                    'date': record['date'],
-                    'formatted_date': record['formatted_date'],
-                    'rates': [],
-                    'count': 0
-                }
-            
-            if record['monthly_rate'] is not None:
-                trends[key]['rates'].append(record['monthly_rate'])
-                trends[key]['count'] += 1
-        
-        # Calculate averages and sort by date
-        trend_list = []
-        for trend in trends.values():
-            if trend['rates']:
-                trend['avg_rate'] = sum(trend['rates']) / len(trend['rates'])
-                trend['max_rate'] = max(trend['rates'])
-                trend['min_rate'] = min(trend['rates'])
-            else:
-                trend['avg_rate'] = 0
-                trend['max_rate'] = 0
-                trend['min_rate'] = 0
-            
-            # Remove the rates array from response
-            del trend['rates']
-            trend_list.append(trend)
-        
-        # Sort by date
-        trend_list.sort(key=lambda x: x['date'] if x['date'] else '')
-        
-        return trend_list
+        key = self._query_key('trends', filters)
+        return self._results.get_or_compute(
+            key,
+            lambda: self._in_flight.do(key, lambda: self.backend.trends(**filters))
+        )
     
     def get_filter_options(self) -> Dict[str, List[str]]:
         """Get available filter options"""
         
-        return {
-            'states': self.data_parser.get_unique_states(),
-            'seasons': self.data_parser.get_unique_seasons(),
-            'age_categories': self.data_parser.get_unique_age_categories(),
-            'sex': self.data_parser.get_unique_sex(),
-            'race': self.data_parser.get_unique_race(),
-            'date_range': self.data_parser.get_date_range()
-        }
+        return self._results.get_or_compute(('filters',), self.backend.filter_options)
+    
+    def get_facet_counts(self,
+                         state: Optional[str] = None,
+                         season: Optional[str] = None,
+                         age_category: Optional[str] = None,
+                         sex: Optional[str] = None,
+                         race: Optional[str] = None,
+                         min_rate: Optional[float] = None,
+                         max_rate: Optional[float] = None,
+                         start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Get matching row counts per value of each filter dimension for a filter set"""
+        
+        filters = dict(state=state, season=season, age_category=age_category, sex=sex, race=race,
+                       min_rate=min_rate, max_rate=max_rate, start_date=start_date, end_date=end_date)
+        
+        key = self._query_key('facets', filters)
+        return self._results.get_or_compute(
+            key,
+            lambda: self._in_flight.do(key, lambda: self.backend.facets(**filters))
+        )
     
     def get_all_records_no_pagination(self,
                                     state: Optional[str] = None,
@@ -199,39 +210,65 @@ class CovidService:
                                     end_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get ALL records without pagination for aggregation purposes"""
         
-        data = self.data_parser.parse_data()
-        
-        # Apply filters (same logic as advanced_search but without pagination)
-        filtered_data = data
+        filters = dict(state=state, season=season, age_category=age_category, sex=sex, race=race,
+                       min_rate=min_rate, max_rate=max_rate, start_date=start_date, end_date=end_date)
         
-        if state:
-            filtered_data = [r for r in filtered_data if r['state'] and r['state'].lower() == state.lower()]
-        
-        if season:
-            filtered_data = [r for r in filtered_data if r['season'] and r['season'].lower() == season.lower()]
-        
-        if age_category:
-            filtered_data = [r for r in filtered_data if r['age_category'] and r['age_category'].lower() == age_category.lower()]
-        
-        if sex:
-            filtered_data = [r for r in filtered_data if r['sex'] and r['sex'].lower() == sex.lower()]
-        
-        if race:
-            filtered_data = [r for r in filtered_data if r['race'] and r['race'].lower() == race.lower()]
-        
-        if min_rate is not None:
-            filtered_data = [r for r in filtered_data if r['monthly_rate'] is not None and r['monthly_rate'] >= min_rate]
-        
-        if max_rate is not None:
-            filtered_data = [r for r in filtered_data if r['monthly_rate'] is not None and r['monthly_rate'] <= max_rate]
-        
-        if start_date:
-            filtered_data = [r for r in filtered_data if r['date'] and r['date'] >= start_date]
+        return self._in_flight.do(
+            self._query_key('all_records', filters),
+            lambda: self.backend.query(**filters)
+        )
+    
+    def estimate_query_cost(self,
+                            kind: str = 'records',
+                            per_page: Optional[int] = None,
+                            fields: Optional[Sequence[str]] = None,
+                            **filters) -> Optional[QueryCost]:
+        """Predict rows touched and response bytes for a query from index statistics.
+        
+        kind is 'records' (unpaginated), 'page' (sorted then paginated),
+        'trends' (aggregated by month) or 'facets' (counted per filter value);
+        fields is the requested projection.
+        Returns None until statistics are collected, so estimating never
+        triggers a data load.
+        """
+        
+        estimate = self.backend.estimate(**filters)
+        if estimate is None:
+            return None
+        
+        if kind == 'trends' and self._results.get(self._query_key('trends', filters)) is not None:
+            # Cached result: only serialization remains
+            return QueryCost(0, estimate['distinct_months'] * TREND_ROW_BYTES)
+        
+        if kind == 'facets':
+            options = self.get_filter_options()
+            facet_bytes = sum(len(options[name]) for name in
+                              ('states', 'seasons', 'age_categories', 'sex', 'race')) * FACET_VALUE_BYTES
+            if self._results.get(self._query_key('facets', filters)) is not None:
+                return QueryCost(0, facet_bytes)
+            # Each field with its own selection is counted over a wider result
+            selected = sum(1 for name in ('state', 'season', 'age_category', 'sex', 'race')
+                           if filters.get(name))
+            return QueryCost(estimate['rows_examined'] * (1 + selected), facet_bytes)
+        
+        matched = estimate['rows_matched']
+        rows_touched = estimate['rows_examined']
+        record_bytes = int(estimate['record_bytes'] * projected_fraction(fields))
+        
+        if kind == 'page':
+            rows_touched += matched  # Every match is sorted before slicing
+            bytes_out = min(matched, per_page or matched) * record_bytes
+        elif kind == 'trends':
+            bytes_out = min(matched, estimate['distinct_months']) * TREND_ROW_BYTES
+        else:
+            bytes_out = matched * record_bytes
         
-        if end_date:
-            filtered_data = [r for r in filtered_data if r['date'] and r['date'] <= end_date]
+        return QueryCost(rows_touched, bytes_out)
+    
+    def explain_query(self, **filters) -> Dict[str, Any]:
+        """Run a filter set and describe the chosen plan and rows examined"""
         
-        return filtered_data
+        return self.backend.explain(**filters)
     
     def advanced_search(self,
                        state: Optional[str] = None,
@@ -249,46 +286,15 @@ class CovidService:
                        sort_order: str = 'desc') -> Dict[str, Any]:
         """Advanced search with multiple filters"""
         
-        data = self.data_parser.parse_data()
-        
-        # Apply filters
-        filtered_data = data
-        
-        if state:
-            filtered_data = [r for r in filtered_data if r['state'] and r['state'].lower() == state.lower()]
-        
-        if season:
-            filtered_data = [r for r in filtered_data if r['season'] and r['season'].lower() == season.lower()]
-        
-        if age_category:
-            filtered_data = [r for r in filtered_data if r['age_category'] and r['age_category'].lower() == age_category.lower()]
+        filters = dict(state=state, season=season, age_category=age_category, sex=sex, race=race,
+                       min_rate=min_rate, max_rate=max_rate, start_date=start_date, end_date=end_date)
         
-        if sex:
-            filtered_data = [r for r in filtered_data if r['sex'] and r['sex'].lower() == sex.lower()]
-        
-        if race:
-            filtered_data = [r for r in filtered_data if r['race'] and r['race'].lower() == race.lower()]
-        
-        if min_rate is not None:
-            filtered_data = [r for r in filtered_data if r['monthly_rate'] is not None and r['monthly_rate'] >= min_rate]
-        
-        if max_rate is not None:
-            filtered_data = [r for r in filtered_data if r['monthly_rate'] is not None and r['monthly_rate'] <= max_rate]
-        
-        if start_date:
-            filtered_data = [r for r in filtered_data if r['date'] and r['date'] >= start_date]
-        
-        if end_date:
-            filtered_data = [r for r in filtered_data if r['date'] and r['date'] <= end_date]
-        
-        # Apply sorting
-        filtered_data = self._sort_data(filtered_data, sort_by, sort_order)
-        
-        # Apply pagination
-        total_records = len(filtered_data)
+        # Apply filters, sorting and pagination
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        paginated_data = filtered_data[start_idx:end_idx]
+        paginated_data, total_records = self.backend.search(
+            sort_by=sort_by, sort_order=sort_order, offset=start_idx, limit=per_page, **filters
+        )
         
         return {
             'data': paginated_data,
@@ -313,38 +319,17 @@ class CovidService:
             }
         }
     
-    def _sort_data(self, data: List[Dict[str, Any]], sort_by: str, sort_order: str) -> List[Dict[str, Any]]:
-        """Sort data by specified field and order"""
-        
-        reverse = sort_order.lower() == 'desc'
-        
-        if sort_by == 'date':
-            return sorted(data, key=lambda x: x['date'] if x['date'] else '', reverse=reverse)
-        elif sort_by == 'state':
-            return sorted(data, key=lambda x: x['state'] if x['state'] else '', reverse=reverse)
-        elif sort_by == 'rate':
-            return sorted(data, key=lambda x: x['monthly_rate'] if x['monthly_rate'] is not None else -1, reverse=reverse)
-        elif sort_by == 'season':
-            return sorted(data, key=lambda x: x['season'] if x['season'] else '', reverse=reverse)
-        elif sort_by == 'age_category':
-            return sorted(data, key=lambda x: x['age_category'] if x['age_category'] else '', reverse=reverse)
-        elif sort_by == 'sex':
-            return sorted(data, key=lambda x: x['sex'] if x['sex'] else '', reverse=reverse)
-        elif sort_by == 'race':
-            return sorted(data, key=lambda x: x['race'] if x['race'] else '', reverse=reverse)
-        else:
-            # Default to date sorting
-            return sorted(data, key=lambda x: x['date'] if x['date'] else '', reverse=reverse)
-    
-    def _get_date_range(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Get date range for a subset of data"""
-        
-        dates = [record['date'] for record in data if record['date']]
-        
-        if not dates:
-            return {'start': None, 'end': None}
-        
-        return {
-            'start': min(dates),
-            'end': max(dates)
-        }
+    def _query_key(self, kind: str, filters: Dict[str, Any]) -> tuple:
+        """Build a normalized key so equivalent filter sets coalesce together"""
+        
+        normalized = []
+        for name in sorted(filters):
+            value = filters[name]
+            if isinstance(value, str) and name not in ('min_rate', 'max_rate'):
+                # Category matching is case-insensitive and empty filters are ignored
+                value = value.lower() if name not in ('start_date', 'end_date') else value
+                value = value or None
+            if value is not None:
+                normalized.append((name, value))
+        
+        return (kind, tuple(normalized))
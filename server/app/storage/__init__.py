@@ -0,0 +1,37 @@
+import os
+from typing import Optional
+
+from app.storage.base import StorageBackend
+from app.storage.memory import MemoryBackend
+from app.storage.parallel import PartitionedExecutor
+from app.storage.sqlite import SqliteBackend
+
+BACKENDS = {
+    MemoryBackend.name: MemoryBackend,
+    SqliteBackend.name: SqliteBackend,
+}
+
+
+def create_backend(data_file_path: str, backend_name: Optional[str] = None) -> StorageBackend:
+    """Create the storage backend selected by name or COVID_STORAGE_BACKEND"""
+    if backend_name is None:
+        backend_name = os.getenv('COVID_STORAGE_BACKEND', MemoryBackend.name)
+
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend_name}")
+
+    if backend_name == SqliteBackend.name:
+        return SqliteBackend(data_file_path, os.getenv('COVID_SQLITE_PATH'))
+
+    workers = int(os.getenv('COVID_PARALLEL_WORKERS', 0))
+    executor = None
+    if workers > 0:
+        executor = PartitionedExecutor(
+            workers,
+            int(os.getenv('COVID_PARALLEL_PARTITIONS', workers)),
+            int(os.getenv('COVID_PARALLEL_MIN_ROWS', 50000))
+        )
+    return MemoryBackend(data_file_path, executor)
+
+
+__all__ = ['StorageBackend', 'MemoryBackend', 'SqliteBackend', 'PartitionedExecutor', 'create_backend']
@@ -0,0 +1,149 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Columns a client may sort by -> record field; anything else sorts by date
+SORT_FIELDS = {
+    'date': 'date',
+    'state': 'state',
+    'rate': 'monthly_rate',
+    'season': 'season',
+    'age_category': 'age_category',
+    'sex': 'sex',
+    'race': 'race',
+}
+
+
+class StorageBackend(ABC):
+    """Interface every dataset storage backend implements.
+
+    Filter keyword arguments are the ones accepted by the query engine:
+    state, state_contains, season, age_category, sex, race, min_rate,
+    max_rate, start_date and end_date. Category filters match
+    case-insensitively, empty filters are ignored, and results are returned
+    in dataset order unless a sort is requested. Sorting is stable, with
+    ties kept in dataset order.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load the dataset and build indexes; idempotent and thread-safe"""
+
+    @abstractmethod
+    def is_loaded(self) -> bool:
+        """Whether queries can run without triggering a load"""
+
+    @abstractmethod
+    def get_load_status(self) -> Dict[str, Any]:
+        """Load phase, progress, data version and total records, without loading"""
+
+    @abstractmethod
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """All records matching filters, in dataset order"""
+
+    @abstractmethod
+    def search(self, sort_by: str = 'date', sort_order: str = 'desc', offset: int = 0,
+               limit: Optional[int] = None, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """One sorted page of matching records, plus the total number of matches"""
+
+    @abstractmethod
+    def trends(self, **filters) -> List[Dict[str, Any]]:
+        """Monthly rate statistics for matching records, ordered by date"""
+
+    @abstractmethod
+    def state_summary(self, state: str) -> Optional[Dict[str, Any]]:
+        """Summary statistics for an exact state match, or None if it has no records"""
+
+    @abstractmethod
+    def filter_options(self) -> Dict[str, Any]:
+        """Distinct values of every filterable field and the overall date range"""
+
+    @abstractmethod
+    def facets(self, **filters) -> Dict[str, Any]:
+        """Matches per distinct value of each categorical field, plus total_records.
+
+        Each field's counts ignore that field's own equality filter, so the
+        alternatives to a selected value keep their counts.
+        """
+
+    @abstractmethod
+    def explain(self, **filters) -> Dict[str, Any]:
+        """Describe how filters would be evaluated and the rows they touch"""
+
+    @abstractmethod
+    def estimate(self, **filters) -> Optional[Dict[str, int]]:
+        """Cheap cardinality estimate from load-time statistics.
+
+        Returns rows_examined, rows_matched, record_bytes (average serialized
+        record size) and distinct_months, or None if the backend is not loaded.
+        """
+
+
+def sort_key(field: str):
+    """Key function matching the dashboard's sort order; missing values sort lowest"""
+    if field == 'monthly_rate':
+        return lambda r: r['monthly_rate'] if r['monthly_rate'] is not None else -1
+    return lambda r: r[field] if r[field] else ''
+
+
+def summarize_trends(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group records by year-month and calculate rate statistics"""
+
+    trends = {}
+    for record in records:
+        key = record['year_month']
+        if key not in trends:
+            trends[key] = {
+                'year_month': key,
+                'date': record['date'],
+                'formatted_date': record['formatted_date'],
+                'rates': [],
+                'count': 0
+            }
+
+        if record['monthly_rate'] is not None:
+            trends[key]['rates'].append(record['monthly_rate'])
+            trends[key]['count'] += 1
+
+    # Calculate averages and sort by date
+    trend_list = []
+    for trend in trends.values():
+        if trend['rates']:
+            trend['avg_rate'] = sum(trend['rates']) / len(trend['rates'])
+            trend['max_rate'] = max(trend['rates'])
+            trend['min_rate'] = min(trend['rates'])
+        else:
+            trend['avg_rate'] = 0
+            trend['max_rate'] = 0
+            trend['min_rate'] = 0
+
+        # Remove the rates array from response
+        del trend['rates']
+        trend_list.append(trend)
+
+    trend_list.sort(key=lambda x: x['date'] if x['date'] else '')
+
+    return trend_list
+
+
+def facet_filters(filters: Dict[str, Any], field: str) -> Dict[str, Any]:
+    """Filters for one facet: everything except the field's own selection"""
+    if not filters.get(field):
+        return filters
+    return {**filters, field: None}
+
+
+def count_facet(values: List[str], counts: Dict[Any, int]) -> Dict[str, int]:
+    """Matches per distinct value, zeros included.
+
+    Values differing only in case share one count, as category filters
+    match case-insensitively.
+    """
+    folded: Dict[str, int] = {}
+    for value, count in counts.items():
+        if value:
+            key = value.lower()
+            folded[key] = folded.get(key, 0) + count
+    return {value: folded.get(value.lower(), 0) for value in values}
@@ -0,0 +1,205 @@
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.storage.base import (
+    SORT_FIELDS, StorageBackend, count_facet, facet_filters, sort_key, summarize_trends
+)
+from app.storage.parallel import PartitionedExecutor
+from app.storage.query_engine import QueryEngine, QueryPlan
+from app.utils.covid_data_parser import CovidDataParser, INDEXED_FIELDS
+
+# A worker pool that cannot start or has died; queries fall back to serial execution
+PARALLEL_FAILURES = (BrokenProcessPool, OSError)
+
+
+class MemoryBackend(StorageBackend):
+    """Keeps every parsed record in the Python heap and filters through the query engine"""
+
+    name = 'memory'
+
+    def __init__(self, data_file_path: str, executor: Optional[PartitionedExecutor] = None):
+        self.data_parser = CovidDataParser(data_file_path)
+        self.query_engine = QueryEngine(self.data_parser)
+        # Optional process pool for scans too large to run well on one core
+        self.executor = executor
+
+    def load(self) -> None:
+        records = self.data_parser.parse_data()
+        self.query_engine.prepare()
+        executor = self.executor
+        if executor is not None:
+            try:
+                executor.prepare(records)
+            except PARALLEL_FAILURES as e:
+                self._disable_parallel(e)
+
+    def is_loaded(self) -> bool:
+        return self.query_engine.is_prepared()
+
+    def get_load_status(self) -> Dict[str, Any]:
+        status = self.data_parser.get_load_status()
+        status['backend'] = self.name
+        status['total_records'] = len(self.data_parser.parse_data()) if self.data_parser.is_loaded() else None
+        return status
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        plan = self.query_engine.compile(**filters)
+
+        # An unfiltered query is the record list itself; there is nothing to scan
+        if (plan.driver or plan.residual) and self._use_parallel(plan):
+            records = self.data_parser.parse_data()
+            result = self._run_parallel(
+                lambda executor: [records[i] for i in executor.positions(**filters)]
+            )
+            if result is not None:
+                return result
+
+        return self.query_engine.execute(plan)
+
+    def search(self, sort_by: str = 'date', sort_order: str = 'desc', offset: int = 0,
+               limit: Optional[int] = None, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        field = SORT_FIELDS.get(sort_by, 'date')
+        descending = sort_order.lower() == 'desc'
+
+        plan = self.query_engine.compile(**filters)
+        if self._use_parallel(plan):
+            records = self.data_parser.parse_data()
+
+            def run(executor):
+                positions, total = executor.search(field, descending, offset, limit, **filters)
+                return [records[i] for i in positions], total
+
+            result = self._run_parallel(run)
+            if result is not None:
+                return result
+
+        data = sorted(self.query_engine.execute(plan), key=sort_key(field), reverse=descending)
+
+        end = None if limit is None else offset + limit
+        return data[offset:end], len(data)
+
+    def trends(self, **filters) -> List[Dict[str, Any]]:
+        plan = self.query_engine.compile(**filters)
+        if self._use_parallel(plan):
+            records = self.data_parser.parse_data()
+            result = self._run_parallel(lambda executor: executor.trends(records, **filters))
+            if result is not None:
+                return result
+
+        return summarize_trends(self.query_engine.execute(plan))
+
+    def state_summary(self, state: str) -> Optional[Dict[str, Any]]:
+        # Filter by exact state match
+        state_data = self.query_engine.query(state=state) if state else []
+
+        if not state_data:
+            return None
+
+        rates = [record['monthly_rate'] for record in state_data if record['monthly_rate'] is not None]
+        dates = [record['date'] for record in state_data if record['date']]
+
+        return {
+            'state': state,
+            'total_records': len(state_data),
+            'date_range': {
+                'start': min(dates) if dates else None,
+                'end': max(dates) if dates else None
+            },
+            'statistics': {
+                'avg_rate': sum(rates) / len(rates) if rates else 0,
+                'max_rate': max(rates) if rates else 0,
+                'min_rate': min(rates) if rates else 0,
+                'total_months': len(set(record['year_month'] for record in state_data))
+            },
+            'seasons': list(set(record['season'] for record in state_data if record['season'])),
+            'age_categories': list(set(record['age_category'] for record in state_data if record['age_category']))
+        }
+
+    def filter_options(self) -> Dict[str, Any]:
+        return {
+            'states': self.data_parser.get_unique_states(),
+            'seasons': self.data_parser.get_unique_seasons(),
+            'age_categories': self.data_parser.get_unique_age_categories(),
+            'sex': self.data_parser.get_unique_sex(),
+            'race': self.data_parser.get_unique_race(),
+            'date_range': self.data_parser.get_date_range()
+        }
+
+    def facets(self, **filters) -> Dict[str, Any]:
+        records = self.data_parser.parse_data()
+        matches = {}
+
+        facets = {}
+        for field in INDEXED_FIELDS:
+            field_filters = facet_filters(filters, field)
+            # Fields without a selection of their own share one result set
+            key = field if field_filters is not filters else None
+            if key not in matches:
+                matches[key] = self.query(**field_filters)
+            rows = matches[key]
+
+            if rows is records:
+                # Nothing filtered: the value index already holds the counts
+                counts = {value: len(p) for value, p in self.data_parser.get_value_index(field).items()}
+            else:
+                counts = Counter(map(itemgetter(field), rows))
+            facets[field] = count_facet(self.data_parser.get_distinct_values(field), counts)
+
+        if None not in matches:
+            matches[None] = self.query(**filters)
+        return {'total_records': len(matches[None]), 'facets': facets}
+
+    def explain(self, **filters) -> Dict[str, Any]:
+        plan = self.query_engine.compile(**filters)
+        self.query_engine.execute(plan)
+        explain = plan.explain()
+        explain['backend'] = self.name
+        executor = self.executor
+        if self._use_parallel(plan) and executor is not None:
+            explain['execution'] = {
+                'mode': 'parallel',
+                'workers': executor.workers,
+                'partitions': executor.partitions
+            }
+        else:
+            explain['execution'] = {'mode': 'serial'}
+        return explain
+
+    def estimate(self, **filters) -> Optional[Dict[str, int]]:
+        if not self.query_engine.is_prepared():
+            return None
+
+        plan = self.query_engine.compile(**filters)
+        return {
+            'rows_examined': plan.estimated_rows,
+            'rows_matched': plan.estimated_rows_matched,
+            'record_bytes': self.query_engine.avg_record_bytes,
+            'distinct_months': self.query_engine.distinct_months
+        }
+
+    def _use_parallel(self, plan: QueryPlan) -> bool:
+        """Fan out only when the plan examines enough rows to repay the round trip"""
+        executor = self.executor
+        return executor is not None and plan.estimated_rows >= executor.min_rows
+
+    def _run_parallel(self, run: Callable[[PartitionedExecutor], Any]) -> Any:
+        """Run a partitioned query; None means the pool is gone and the caller runs serially"""
+        executor = self.executor
+        if executor is None:
+            return None
+
+        try:
+            # Partitions are normally built by load(); queries before it build them lazily
+            executor.prepare(self.data_parser.parse_data())
+            return run(executor)
+        except PARALLEL_FAILURES as e:
+            self._disable_parallel(e)
+            return None
+
+    def _disable_parallel(self, error: BaseException) -> None:
+        print(f"Parallel execution disabled, worker pool failed: {error}")
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.close()
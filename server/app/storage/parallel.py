@@ -0,0 +1,361 @@
+import atexit
+import heapq
+import multiprocessing
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.storage.base import SORT_FIELDS, sort_key
+from app.storage.query_engine import iter_filter_steps
+from app.utils.covid_data_parser import INDEXED_FIELDS
+
+# Worker-side templates for the fused predicate; c<n> is a column, v<n> its bound
+_CONDITION_TEMPLATES = {
+    'in': "c{n}[i] in v{n}",
+    'ge': "c{n}[i] >= v{n}",
+    'le': "c{n}[i] <= v{n}",
+}
+
+
+def _sort_column(field: str) -> str:
+    return f"sort_{field}"
+
+
+# Worker process state: segments are attached on first use and kept for the
+# life of the worker; filter values arrive already encoded as column codes
+
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, Dict[str, memoryview]]] = {}
+_scans: Dict[Tuple[Tuple[str, str], ...], Callable] = {}
+
+
+def _attach(segment: Dict[str, Any]) -> Dict[str, memoryview]:
+    entry = _attached.get(segment['name'])
+    if entry is None:
+        # Spawned workers share the parent's resource tracker, so the parent's
+        # unlink at close() is the only cleanup needed
+        shm = shared_memory.SharedMemory(name=segment['name'])
+        columns = {
+            column: shm.buf[offset:offset + nbytes].cast(typecode)
+            for column, (offset, nbytes, typecode) in segment['layout'].items()
+        }
+        entry = (shm, columns)
+        _attached[segment['name']] = entry
+    return entry[1]
+
+
+def _get_scan(conditions: List[Tuple[str, str, Any]]) -> Callable:
+    """Generated scan returning partition-local row numbers that pass every condition"""
+    shape = tuple((column, op) for column, op, _ in conditions)
+    scan = _scans.get(shape)
+    if scan is None:
+        params = ''.join(f", c{n}, v{n}" for n in range(len(conditions)))
+        condition = ' and '.join(
+            _CONDITION_TEMPLATES[op].format(n=n) for n, (_, op, _) in enumerate(conditions)
+        ) or 'True'
+        source = (
+            f"def scan(rows{params}):\n"
+            f"    return [i for i in range(rows) if {condition}]\n"
+        )
+        namespace: Dict[str, Any] = {}
+        exec(compile(source, '<partition-scan>', 'exec'), namespace)
+        scan = _scans[shape] = namespace['scan']
+    return scan
+
+
+def _matching_rows(segment: Dict[str, Any], conditions: List[Tuple[str, str, Any]]) -> List[int]:
+    columns = _attach(segment)
+    args = []
+    for column, _, value in conditions:
+        args.append(columns[column])
+        args.append(value)
+    return _get_scan(conditions)(segment['rows'], *args)
+
+
+def _task_attach(segment: Dict[str, Any]) -> int:
+    _attach(segment)
+    return segment['rows']
+
+
+def _task_positions(segment: Dict[str, Any], conditions: List[Tuple[str, str, Any]]) -> array:
+    start = segment['start']
+    return array('i', [start + i for i in _matching_rows(segment, conditions)])
+
+
+def _task_trends(segment: Dict[str, Any],
+                 conditions: List[Tuple[str, str, Any]]) -> Dict[int, List[Any]]:
+    """Partial monthly aggregates: code -> [count, sum, min, max, first position]"""
+    columns = _attach(segment)
+    months = columns['year_month']
+    rates = columns['monthly_rate']
+    start = segment['start']
+
+    groups: Dict[int, List[Any]] = {}
+    for i in _matching_rows(segment, conditions):
+        group = groups.get(months[i])
+        if group is None:
+            group = groups[months[i]] = [0, 0.0, None, None, start + i]
+        rate = rates[i]
+        if rate == rate:  # NaN marks a missing rate
+            group[0] += 1
+            group[1] += rate
+            group[2] = rate if group[2] is None or rate < group[2] else group[2]
+            group[3] = rate if group[3] is None or rate > group[3] else group[3]
+    return groups
+
+
+def _task_top(segment: Dict[str, Any], conditions: List[Tuple[str, str, Any]],
+              sort_column: str, descending: bool, limit: Optional[int]) -> Tuple[int, List[Tuple[Any, int]]]:
+    """Match count plus the first `limit` (key, position) pairs in sort order"""
+    columns = _attach(segment)
+    keys = columns[sort_column]
+    start = segment['start']
+    rows = _matching_rows(segment, conditions)
+
+    # Sorting row numbers keeps ties in dataset order, also when reversed
+    ordered = sorted(rows, key=keys.__getitem__, reverse=descending)
+    if limit is not None:
+        del ordered[limit:]
+
+    sign = -1 if descending else 1
+    pairs = [(sign * keys[i], start + i) for i in ordered]
+    return len(rows), pairs
+
+
+def _release(shared: List[shared_memory.SharedMemory]) -> None:
+    """Close and unlink segments created by this process"""
+    for shm in shared:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class PartitionedExecutor:
+    """Scatter-gather execution of scans over shared-memory row-range partitions.
+
+    Records are encoded into compact columns (dictionary codes for
+    categories and months, ranks for dates and sort keys, floats for rates),
+    split into contiguous row ranges, and each range is copied into its own
+    shared-memory segment. Filters are encoded once in the parent, evaluated
+    by a process pool over every partition, and the partial results merged:
+    positions are concatenated in partition order, monthly aggregates are
+    combined, and sorted pages are k-way merged.
+    """
+
+    def __init__(self, workers: int, partitions: Optional[int] = None, min_rows: int = 50000):
+        self.workers = workers
+        self.partitions = partitions or workers
+        # Plans touching fewer rows than this stay in-process
+        self.min_rows = min_rows
+        self._segments: List[Dict[str, Any]] = []
+        self._shared: List[shared_memory.SharedMemory] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._codes: Dict[str, Dict[Any, int]] = {}
+        self._dates: List[str] = []
+        self._month_values: List[Any] = []
+        self._prepare_lock = threading.Lock()
+
+    def prepare(self, records: List[Dict[str, Any]]) -> None:
+        """Encode records into shared-memory partitions and start the worker pool"""
+        if self._pool is not None:
+            return
+
+        with self._prepare_lock:
+            if self._pool is None:
+                self._prepare(records)
+
+    def _prepare(self, records: List[Dict[str, Any]]) -> None:
+        columns: Dict[str, array] = {}
+
+        # Lower-cased category codes back the case-insensitive filters
+        category_codes: Dict[str, Dict[Any, int]] = {}
+        for field in INDEXED_FIELDS:
+            codes = category_codes[field] = {}
+            columns[field] = array('i', (
+                codes.setdefault(r[field].lower(), len(codes)) if r[field] else -1 for r in records
+            ))
+
+        # Month codes group trends; first-seen order is kept for the merge
+        months: Dict[Any, int] = {}
+        columns['year_month'] = array('i', (
+            months.setdefault(r['year_month'], len(months)) for r in records
+        ))
+
+        # Date ranks answer string range filters exactly; -1 marks a missing date
+        dates = sorted({r['date'] for r in records if r['date']})
+        date_ranks = {value: rank for rank, value in enumerate(dates)}
+        columns['date'] = array('i', (date_ranks[r['date']] if r['date'] else -1 for r in records))
+
+        columns['monthly_rate'] = array('d', (
+            r['monthly_rate'] if r['monthly_rate'] is not None else float('nan') for r in records
+        ))
+
+        # Sort keys as ranks so workers compare small ints instead of strings
+        for field in sorted(set(SORT_FIELDS.values()) - {'monthly_rate'}):
+            key = sort_key(field)
+            ranks = {value: rank for rank, value in enumerate(sorted({key(r) for r in records}))}
+            columns[_sort_column(field)] = array('i', (ranks[key(r)] for r in records))
+        columns[_sort_column('monthly_rate')] = array('d', map(sort_key('monthly_rate'), records))
+
+        # Nothing is published until the workers have mapped every segment, so a
+        # failed start leaves the executor empty and prepare() can be retried
+        segments: List[Dict[str, Any]] = []
+        shared: List[shared_memory.SharedMemory] = []
+        pool = None
+        try:
+            total = len(records)
+            bounds = [total * p // self.partitions for p in range(self.partitions + 1)]
+            for start, end in zip(bounds, bounds[1:]):
+                segment, shm = self._create_segment(columns, start, end)
+                shared.append(shm)
+                segments.append(segment)
+
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+            # Start the workers and map the segments now rather than on the first query
+            for future in [pool.submit(_task_attach, segment) for segment in segments]:
+                future.result()
+        except BaseException:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            _release(shared)
+            raise
+
+        self._codes = category_codes
+        self._month_values = list(months)
+        self._dates = dates
+        self._segments = segments
+        self._shared = shared
+        self._pool = pool
+        atexit.register(self.close)
+
+    def is_prepared(self) -> bool:
+        return self._pool is not None
+
+    def positions(self, **filters) -> List[int]:
+        """Positions of matching records, in dataset order"""
+        conditions = self._encode(filters)
+        if conditions is None:
+            return []
+
+        positions: List[int] = []
+        for partial in self._scatter(_task_positions, conditions):
+            positions.extend(partial)
+        return positions
+
+    def search(self, sort_field: str, descending: bool, offset: int, limit: Optional[int],
+               **filters) -> Tuple[List[int], int]:
+        """Positions for one sorted page, plus the total number of matches"""
+        conditions = self._encode(filters)
+        if conditions is None:
+            return [], 0
+
+        # Negative offsets need the total first, so fetch every key in that case
+        top = None if limit is None or offset < 0 else offset + limit
+        partials = self._scatter(_task_top, conditions, _sort_column(sort_field), descending, top)
+
+        total = sum(count for count, _ in partials)
+        start, stop, _ = slice(offset, None if limit is None else offset + limit).indices(total)
+        merged = heapq.merge(*(pairs for _, pairs in partials))
+        return [position for _, position in islice(merged, start, stop)], total
+
+    def trends(self, records: List[Dict[str, Any]], **filters) -> List[Dict[str, Any]]:
+        """Monthly rate statistics merged from per-partition aggregates"""
+        conditions = self._encode(filters)
+        if conditions is None:
+            return []
+
+        merged: Dict[int, List[Any]] = {}
+        for partial in self._scatter(_task_trends, conditions):
+            for code, (count, total, low, high, first) in partial.items():
+                group = merged.get(code)
+                if group is None:
+                    merged[code] = [count, total, low, high, first]
+                    continue
+                group[0] += count
+                group[1] += total
+                if low is not None:
+                    group[2] = low if group[2] is None else min(group[2], low)
+                    group[3] = high if group[3] is None else max(group[3], high)
+                group[4] = min(group[4], first)
+
+        trend_list = []
+        # First-seen order, then a stable sort by date, as the serial version does
+        for code, (count, total, low, high, first) in sorted(merged.items(), key=lambda g: g[1][4]):
+            record = records[first]
+            trend_list.append({
+                'year_month': self._month_values[code],
+                'date': record['date'],
+                'formatted_date': record['formatted_date'],
+                'count': count,
+                'avg_rate': total / count if count else 0,
+                'max_rate': high if count else 0,
+                'min_rate': low if count else 0
+            })
+        trend_list.sort(key=lambda x: x['date'] if x['date'] else '')
+        return trend_list
+
+    def close(self) -> None:
+        """Stop the workers and release every shared-memory segment"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        _release(self._shared)
+        self._shared = []
+        self._segments = []
+
+    def _create_segment(self, columns: Dict[str, array], start: int,
+                        end: int) -> Tuple[Dict[str, Any], shared_memory.SharedMemory]:
+        layout = {}
+        offset = 0
+        for column, values in columns.items():
+            nbytes = (end - start) * values.itemsize
+            layout[column] = (offset, nbytes, values.typecode)
+            # Keep every column 8-byte aligned
+            offset += (nbytes + 7) // 8 * 8
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for column, values in columns.items():
+                column_offset, nbytes, _ = layout[column]
+                shm.buf[column_offset:column_offset + nbytes] = values[start:end].tobytes()
+        except BaseException:
+            _release([shm])
+            raise
+
+        return {'name': shm.name, 'start': start, 'rows': end - start, 'layout': layout}, shm
+
+    def _encode(self, filters: Dict[str, Any]) -> Optional[List[Tuple[str, str, Any]]]:
+        """Translate filters into column conditions; None when nothing can match"""
+        conditions = []
+        for _, field, op, value in iter_filter_steps(filters):
+            if op in ('eq', 'contains'):
+                codes = self._codes[field]
+                value = value.lower()
+                if op == 'eq':
+                    matched = frozenset([codes[value]]) if value in codes else frozenset()
+                else:
+                    matched = frozenset(code for key, code in codes.items() if value in key)
+                if not matched:
+                    return None
+                conditions.append((field, 'in', matched))
+            elif field == 'date':
+                if op == 'gte':
+                    conditions.append(('date', 'ge', bisect_left(self._dates, value)))
+                else:
+                    conditions.append(('date', 'le', bisect_right(self._dates, value) - 1))
+                    # Missing dates (-1) never satisfy a date filter
+                    conditions.append(('date', 'ge', 0))
+            else:
+                conditions.append(('monthly_rate', 'ge' if op == 'gte' else 'le', value))
+        return conditions
+
+    def _scatter(self, task: Callable, *args) -> List[Any]:
+        futures = [self._pool.submit(task, segment, *args) for segment in self._segments]
+        return [future.result() for future in futures]
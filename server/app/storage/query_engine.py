@@ -0,0 +1,312 @@
+import heapq
+import json
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.covid_data_parser import CovidDataParser, INDEXED_FIELDS
+
+
+# Filter parameter -> (record field, operator)
+FILTER_STEPS = {
+    'state': ('state', 'eq'),
+    'state_contains': ('state', 'contains'),
+    'season': ('season', 'eq'),
+    'age_category': ('age_category', 'eq'),
+    'sex': ('sex', 'eq'),
+    'race': ('race', 'eq'),
+    'min_rate': ('monthly_rate', 'gte'),
+    'max_rate': ('monthly_rate', 'lte'),
+    'start_date': ('date', 'gte'),
+    'end_date': ('date', 'lte'),
+}
+
+RANGE_FIELDS = ('monthly_rate', 'date')
+
+
+def iter_filter_steps(filters: Dict[str, Any]) -> Iterator[Tuple[str, str, str, Any]]:
+    """Yield (param, field, op, value) for each filter that applies.
+
+    Empty category and date filters are ignored, as they always were; rate
+    bounds apply whenever they are set.
+    """
+    for param, value in filters.items():
+        if param not in FILTER_STEPS:
+            raise ValueError(f"Unknown filter: {param}")
+        field, op = FILTER_STEPS[param]
+
+        if value is None or (not value and (op == 'eq' or field == 'date')):
+            continue
+
+        yield param, field, op, value
+
+# Records sampled to estimate the serialized size of one record
+SIZE_SAMPLE_ROWS = 200
+
+# Expression templates for the fused predicate; c<n> is the column, v<n> the value
+_CONDITION_TEMPLATES = {
+    'eq': "c{n}[i] == v{n}",
+    'contains': "c{n}[i] in v{n}",
+    'gte': "(c{n}[i] is not None and c{n}[i] >= v{n})",
+    'lte': "(c{n}[i] is not None and c{n}[i] <= v{n})",
+}
+
+
+class QueryStep:
+    """A single filter condition with its estimated cardinality"""
+
+    def __init__(self, param: str, field: str, op: str, value: Any, estimated_rows: int,
+                 fanout: int = 1):
+        self.param = param
+        self.field = field
+        self.op = op
+        self.value = value
+        self.estimated_rows = estimated_rows
+        # Number of index posting lists the step unions together
+        self.fanout = fanout
+
+    def describe(self, total_rows: int) -> Dict[str, Any]:
+        return {
+            'param': self.param,
+            'field': self.field,
+            'op': self.op,
+            'value': self.value,
+            'estimated_rows': self.estimated_rows,
+            'selectivity': round(self.estimated_rows / total_rows, 6) if total_rows else 0.0
+        }
+
+
+class QueryPlan:
+    """A compiled filter set: a driving access path plus a fused residual predicate"""
+
+    def __init__(self, total_rows: int, driver: Optional[QueryStep], residual: List[QueryStep]):
+        self.total_rows = total_rows
+        self.driver = driver
+        self.residual = residual
+        self.rows_examined: Optional[int] = None
+        self.rows_matched: Optional[int] = None
+
+    @property
+    def access_path(self) -> str:
+        if self.driver is None:
+            return 'full_scan'
+        return 'range_index' if self.driver.field in RANGE_FIELDS else 'value_index'
+
+    @property
+    def estimated_rows(self) -> int:
+        return self.total_rows if self.driver is None else self.driver.estimated_rows
+
+    @property
+    def estimated_rows_matched(self) -> int:
+        """Output rows assuming the filter conditions are independent"""
+        if self.driver is None:
+            matched = float(self.total_rows)
+        else:
+            matched = float(self.driver.estimated_rows)
+        for step in self.residual:
+            matched *= step.estimated_rows / self.total_rows if self.total_rows else 0
+        return int(math.ceil(matched))
+
+    def explain(self) -> Dict[str, Any]:
+        """Describe the chosen plan and, once executed, the rows it touched"""
+        return {
+            'access_path': self.access_path,
+            'driver': self.driver.describe(self.total_rows) if self.driver else None,
+            'predicates': [step.describe(self.total_rows) for step in self.residual],
+            'total_rows': self.total_rows,
+            'estimated_rows_examined': self.estimated_rows,
+            'estimated_rows_matched': self.estimated_rows_matched,
+            'rows_examined': self.rows_examined,
+            'rows_matched': self.rows_matched
+        }
+
+
+class QueryEngine:
+    """Compiles filter parameters into index plans over the parsed dataset.
+
+    Statistics (lower-cased categorical columns, per-value postings from the
+    parser's value indexes, and sorted rate/date orders) are collected once
+    after load and used to pick the most selective access path and to order
+    the remaining conditions, which run as one generated predicate.
+    """
+
+    def __init__(self, data_parser: CovidDataParser):
+        self.data_parser = data_parser
+        self._stats_lock = threading.Lock()
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._columns: Dict[str, List[Any]] = {}
+        self._range_orders: Dict[str, Tuple[List[Any], List[int]]] = {}
+        self.avg_record_bytes = 0
+        self.distinct_months = 0
+        # Generated scan functions keyed by the shape of the residual predicate
+        self._compiled: Dict[Tuple[Tuple[str, str], ...], Callable] = {}
+        self._compiled_lock = threading.Lock()
+
+    def is_prepared(self) -> bool:
+        """Whether statistics have been collected, i.e. plans are cheap to build"""
+        return self._records is not None
+
+    def prepare(self) -> None:
+        """Collect column statistics; safe to call repeatedly from any thread"""
+        if self._records is not None:
+            return
+
+        with self._stats_lock:
+            if self._records is not None:
+                return
+
+            records = self.data_parser.parse_data()
+
+            columns = {}
+            for field in INDEXED_FIELDS:
+                columns[field] = [r[field].lower() if r[field] else None for r in records]
+            for field in RANGE_FIELDS:
+                columns[field] = [r[field] for r in records]
+
+            range_orders = {}
+            for field in RANGE_FIELDS:
+                column = columns[field]
+                # Date strings compare the same way the original filters do, so
+                # falsy dates are excluded just like missing rates
+                order = sorted(
+                    (i for i, value in enumerate(column) if value is not None and value != ''),
+                    key=column.__getitem__
+                )
+                range_orders[field] = ([column[i] for i in order], order)
+
+            step = max(1, len(records) // SIZE_SAMPLE_ROWS)
+            sample = records[::step][:SIZE_SAMPLE_ROWS]
+            if sample:
+                self.avg_record_bytes = len(json.dumps(sample)) // len(sample)
+            self.distinct_months = len(set(range_orders['date'][0]))
+
+            self._columns = columns
+            self._range_orders = range_orders
+            self._records = records
+
+    def compile(self, **filters) -> QueryPlan:
+        """Turn filter parameters into a plan ordered by estimated selectivity"""
+        self.prepare()
+        total_rows = len(self._records)
+
+        steps = [
+            self._make_step(param, field, op, value)
+            for param, field, op, value in iter_filter_steps(filters)
+        ]
+
+        # Cheapest access path wins; a full scan costs one look per row
+        driver = None
+        best_cost = total_rows
+        for step in steps:
+            cost = self._access_cost(step)
+            if cost < best_cost:
+                driver, best_cost = step, cost
+
+        residual = sorted((s for s in steps if s is not driver), key=lambda s: s.estimated_rows)
+        return QueryPlan(total_rows, driver, residual)
+
+    def execute(self, plan: QueryPlan) -> List[Dict[str, Any]]:
+        """Run a plan, returning matching records in dataset order"""
+        records = self._records
+
+        if plan.driver is None and not plan.residual:
+            plan.rows_examined = plan.rows_matched = len(records)
+            return records
+
+        positions = self._driver_positions(plan.driver)
+        plan.rows_examined = len(positions)
+
+        if plan.residual:
+            scan = self._get_scan(plan.residual)
+            args = []
+            for step in plan.residual:
+                args.append(self._columns[step.field])
+                args.append(self._predicate_value(step))
+            result = scan(positions, records, *args)
+        else:
+            result = [records[i] for i in positions]
+
+        plan.rows_matched = len(result)
+        return result
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """Compile and execute filters in one call"""
+        return self.execute(self.compile(**filters))
+
+    def _make_step(self, param: str, field: str, op: str, value: Any) -> QueryStep:
+        if op == 'eq':
+            value = value.lower()
+            postings = self.data_parser.get_value_index(field).get(value, [])
+            return QueryStep(param, field, op, value, len(postings))
+
+        if op == 'contains':
+            value = value.lower()
+            index = self.data_parser.get_value_index(field)
+            postings = [p for key, p in index.items() if value in key]
+            return QueryStep(param, field, op, value, sum(len(p) for p in postings), len(postings))
+
+        values, _ = self._range_orders[field]
+        if op == 'gte':
+            estimated = len(values) - bisect_left(values, value)
+        else:
+            estimated = bisect_right(values, value)
+        return QueryStep(param, field, op, value, estimated)
+
+    def _access_cost(self, step: QueryStep) -> float:
+        """Estimated work to produce a step's rows in dataset order"""
+        rows = step.estimated_rows
+        if step.op == 'eq':
+            return rows
+        if step.op == 'contains':
+            # Posting lists are already in position order and only need merging
+            return rows * max(1.0, math.log2(step.fanout or 1))
+        # Range slices must be re-sorted by position
+        return rows * max(1.0, math.log2(rows or 1))
+
+    def _driver_positions(self, driver: Optional[QueryStep]) -> Any:
+        if driver is None:
+            return range(len(self._records))
+
+        if driver.op == 'eq':
+            return self.data_parser.get_value_index(driver.field).get(driver.value, [])
+
+        if driver.op == 'contains':
+            index = self.data_parser.get_value_index(driver.field)
+            return list(heapq.merge(*(p for key, p in index.items() if driver.value in key)))
+
+        values, order = self._range_orders[driver.field]
+        if driver.op == 'gte':
+            return sorted(order[bisect_left(values, driver.value):])
+        return sorted(order[:bisect_right(values, driver.value)])
+
+    def _predicate_value(self, step: QueryStep) -> Any:
+        if step.op == 'contains':
+            index = self.data_parser.get_value_index(step.field)
+            return frozenset(key for key in index if step.value in key)
+        return step.value
+
+    def _get_scan(self, residual: List[QueryStep]) -> Callable:
+        """Get (generating on first use) a scan function for the predicate shape"""
+        shape = tuple((step.field, step.op) for step in residual)
+        scan = self._compiled.get(shape)
+        if scan is not None:
+            return scan
+
+        # Only fixed templates and positional names go into the source; filter
+        # values are passed in as arguments
+        params = ', '.join(f"c{n}, v{n}" for n in range(len(residual)))
+        condition = ' and '.join(
+            _CONDITION_TEMPLATES[step.op].format(n=n) for n, step in enumerate(residual)
+        )
+        source = (
+            f"def scan(positions, records, {params}):\n"
+            f"    return [records[i] for i in positions if {condition}]\n"
+        )
+        namespace: Dict[str, Any] = {}
+        exec(compile(source, '<query-engine>', 'exec'), namespace)
+        scan = namespace['scan']
+
+        with self._compiled_lock:
+            self._compiled[shape] = scan
+        return scan
@@ -0,0 +1,491 @@
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not coordinated across processes
+    fcntl = None
+
+from app.storage.base import SORT_FIELDS, StorageBackend, count_facet, facet_filters
+from app.storage.query_engine import iter_filter_steps
+from app.utils.covid_data_parser import CovidDataParser, INDEXED_FIELDS, RECORD_FIELDS
+
+
+# Bump when the table layout or indexes change so stale files are rebuilt
+SCHEMA_VERSION = '1'
+
+# Lower-cased copies of the categorical fields back case-insensitive filters
+KEY_COLUMNS = tuple(f"{field}_key" for field in INDEXED_FIELDS)
+
+# Untyped columns keep the exact JSON value types the memory backend returns
+_CREATE_TABLE = (
+    "CREATE TABLE records ("
+    "id INTEGER PRIMARY KEY, state, season, year_month, year INTEGER, month INTEGER, "
+    "date TEXT, month_name TEXT, formatted_date, age_category, sex, race, "
+    "monthly_rate REAL, rate_type, "
+    + ', '.join(f"{column} TEXT" for column in KEY_COLUMNS)
+    + ")"
+)
+
+# Selectivity assumed for a rate or date bound when estimating cost
+RANGE_SELECTIVITY = 1 / 3
+
+INSERT_BATCH_ROWS = 10000
+
+# Records sampled to estimate the serialized size of one record
+SIZE_SAMPLE_ROWS = 200
+
+
+def _sort_expression(field: str) -> str:
+    """SQL equivalent of the in-memory sort key (missing values sort lowest)"""
+    if field == 'monthly_rate':
+        return "COALESCE(monthly_rate, -1)"
+    return f"COALESCE({field}, '')"
+
+
+def _index_statements() -> List[str]:
+    statements = []
+    # Each categorical filter, with the range columns so bounds resolve in the index
+    for field, column in zip(INDEXED_FIELDS, KEY_COLUMNS):
+        statements.append(
+            f"CREATE INDEX idx_{field} ON records({column}, date, monthly_rate)"
+        )
+    statements.append("CREATE INDEX idx_date ON records(date, monthly_rate)")
+    statements.append("CREATE INDEX idx_rate ON records(monthly_rate)")
+    # Sort orders, with id so ties keep dataset order without a sort step
+    for field in sorted(set(SORT_FIELDS.values())):
+        statements.append(
+            f"CREATE INDEX idx_sort_{field} ON records({_sort_expression(field)}, id)"
+        )
+    return statements
+
+
+class SqliteBackend(StorageBackend):
+    """Serves queries from an embedded SQLite file with indexed filter and sort columns.
+
+    On first load the JSON data file is streamed into the database; later
+    starts reuse the file as long as it was built from the same data version
+    (or the JSON source is absent). Only query results and SQLite's page
+    cache are held in memory.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, data_file_path: str, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.path.splitext(data_file_path)[0] + '.sqlite3'
+        self.db_path = db_path
+        self.data_parser = CovidDataParser(data_file_path)
+        self.cache_kib = int(os.getenv('COVID_SQLITE_CACHE_KIB', 16384))
+        self.pool_size = max(1, int(os.getenv('COVID_SQLITE_POOL_SIZE', 4)))
+
+        self._load_lock = threading.Lock()
+        # Idle connections, most recently used first so their page caches stay warm
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._loaded = False
+        self._importing = False
+
+        self.phase = 'idle'
+        self.load_error: Optional[str] = None
+        self.data_version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+
+        # Load-time statistics used for cost estimates and contains filters
+        self.total_records = 0
+        self.record_bytes = 0
+        self.distinct_months = 0
+        self._value_counts: Dict[str, Dict[str, int]] = {}
+        self._distinct_values: Dict[str, List[Any]] = {}
+
+    def load(self) -> None:
+        if self._loaded:
+            return
+
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                self.load_error = None
+                self.phase = 'opening'
+                source_version = self.data_parser.compute_data_version()
+                if not self._is_current(source_version):
+                    with self._build_lock():
+                        # Another process may have finished the build while we waited
+                        if not self._is_current(source_version):
+                            self._build(source_version)
+
+                self.phase = 'indexing'
+                self._collect_statistics()
+                self.loaded_at = time.time()
+                self._loaded = True
+                self.phase = 'ready'
+            except Exception as e:
+                self.phase = 'error'
+                self.load_error = str(e)
+                raise
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def get_load_status(self) -> Dict[str, Any]:
+        if self._importing:
+            # Row progress comes from the parser while the file is streamed in
+            status = self.data_parser.get_load_status()
+            status['phase'] = 'importing' if status['phase'] == 'parsing' else status['phase']
+        else:
+            status = {
+                'phase': self.phase,
+                'progress': 1.0 if self._loaded else 0.0,
+                'rows_parsed': self.total_records,
+                'rows_total': self.total_records,
+                'loaded_at': self.loaded_at,
+                'error': self.load_error
+            }
+        status['data_version'] = self.data_version
+        status['backend'] = self.name
+        status['total_records'] = self.total_records if self._loaded else None
+        return status
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        where, params = self._where(filters)
+        rows = self._execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM records WHERE {where} ORDER BY id", params
+        )
+        return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
+    def search(self, sort_by: str = 'date', sort_order: str = 'desc', offset: int = 0,
+               limit: Optional[int] = None, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        where, params = self._where(filters)
+        total = self._execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)[0][0]
+
+        expression = _sort_expression(SORT_FIELDS.get(sort_by, 'date'))
+        direction = 'DESC' if sort_order.lower() == 'desc' else 'ASC'
+        # Resolve the page exactly as slicing the full result list would
+        start, stop, _ = slice(offset, None if limit is None else offset + limit).indices(total)
+        rows = self._execute(
+            f"SELECT {', '.join(RECORD_FIELDS)} FROM records WHERE {where} "
+            f"ORDER BY {expression} {direction}, id LIMIT ? OFFSET ?",
+            params + [max(0, stop - start), start]
+        )
+        return [dict(zip(RECORD_FIELDS, row)) for row in rows], total
+
+    def trends(self, **filters) -> List[Dict[str, Any]]:
+        where, params = self._where(filters)
+        rows = self._execute(
+            "SELECT year_month, date, formatted_date, COUNT(monthly_rate), "
+            "COALESCE(AVG(monthly_rate), 0), COALESCE(MAX(monthly_rate), 0), "
+            "COALESCE(MIN(monthly_rate), 0), MIN(id) AS first_id "
+            f"FROM records WHERE {where} GROUP BY year_month "
+            "ORDER BY COALESCE(date, ''), first_id",
+            params
+        )
+        return [
+            {
+                'year_month': year_month,
+                'date': date,
+                'formatted_date': formatted_date,
+                'count': count,
+                'avg_rate': avg_rate,
+                'max_rate': max_rate,
+                'min_rate': min_rate
+            }
+            for year_month, date, formatted_date, count, avg_rate, max_rate, min_rate, _ in rows
+        ]
+
+    def state_summary(self, state: str) -> Optional[Dict[str, Any]]:
+        if not state:
+            return None
+
+        params = [state.lower()]
+        total, start, end, avg_rate, max_rate, min_rate, months = self._execute(
+            "SELECT COUNT(*), MIN(date), MAX(date), COALESCE(AVG(monthly_rate), 0), "
+            "COALESCE(MAX(monthly_rate), 0), COALESCE(MIN(monthly_rate), 0), "
+            # Records without a month count as one more month, as in the memory backend
+            "COUNT(DISTINCT year_month) + MAX(year_month IS NULL) FROM records WHERE state_key = ?",
+            params
+        )[0]
+
+        if not total:
+            return None
+
+        return {
+            'state': state,
+            'total_records': total,
+            'date_range': {'start': start, 'end': end},
+            'statistics': {
+                'avg_rate': avg_rate,
+                'max_rate': max_rate,
+                'min_rate': min_rate,
+                'total_months': months
+            },
+            'seasons': self._distinct('season', "state_key = ?", params),
+            'age_categories': self._distinct('age_category', "state_key = ?", params)
+        }
+
+    def filter_options(self) -> Dict[str, Any]:
+        start, end = self._execute("SELECT MIN(date), MAX(date) FROM records")[0]
+        return {
+            'states': self._distinct('state'),
+            'seasons': self._distinct('season'),
+            'age_categories': self._distinct('age_category'),
+            'sex': self._distinct('sex'),
+            'race': self._distinct('race'),
+            'date_range': {'start': start, 'end': end}
+        }
+
+    def facets(self, **filters) -> Dict[str, Any]:
+        where, params = self._where(filters)
+        total = self._execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)[0][0]
+
+        facets = {}
+        for field in INDEXED_FIELDS:
+            field_where, field_params = self._where(facet_filters(filters, field))
+            if field_where == '1':
+                counts = self._value_counts[field]
+            else:
+                # One grouped pass per field over the lower-cased key the filters
+                # use; the unary + keeps the grouping column's index from being
+                # picked over the indexes that serve the filters
+                counts = dict(self._execute(
+                    f"SELECT {field}_key, COUNT(*) FROM records WHERE {field_where} "
+                    f"AND {field}_key IS NOT NULL GROUP BY +{field}_key",
+                    field_params
+                ))
+            if field not in self._distinct_values:
+                self._distinct_values[field] = self._distinct(field)
+            facets[field] = count_facet(self._distinct_values[field], counts)
+
+        return {'total_records': total, 'facets': facets}
+
+    def explain(self, **filters) -> Dict[str, Any]:
+        where, params = self._where(filters)
+        plan = self._execute(f"EXPLAIN QUERY PLAN SELECT id FROM records WHERE {where}", params)
+        matched = self._execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)[0][0]
+        estimate = self.estimate(**filters)
+        return {
+            'backend': self.name,
+            'access_path': 'sqlite',
+            'where': where,
+            'plan': [row[-1] for row in plan],
+            'total_rows': self.total_records,
+            'estimated_rows_examined': estimate['rows_examined'],
+            'estimated_rows_matched': estimate['rows_matched'],
+            'rows_examined': None,
+            'rows_matched': matched
+        }
+
+    def estimate(self, **filters) -> Optional[Dict[str, int]]:
+        if not self._loaded:
+            return None
+
+        total = self.total_records
+        driver = total
+        selectivity = 1.0
+        for _, field, op, value in iter_filter_steps(filters):
+            if op == 'eq':
+                rows = self._value_counts[field].get(value.lower(), 0)
+            elif op == 'contains':
+                rows = sum(n for key, n in self._value_counts[field].items() if value.lower() in key)
+            else:
+                rows = int(total * RANGE_SELECTIVITY)
+                selectivity *= RANGE_SELECTIVITY
+                continue
+            driver = min(driver, rows)
+            selectivity *= rows / total if total else 0
+
+        return {
+            'rows_examined': driver,
+            'rows_matched': int(total * selectivity + 0.5),
+            'record_bytes': self.record_bytes,
+            'distinct_months': self.distinct_months
+        }
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool shared by all request threads.
+
+        The server starts a thread per request, so per-thread connections would
+        open a new connection, with a cold page cache, for every request. When
+        more requests run at once than the pool holds, the extra connections
+        are closed after use.
+        """
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA cache_size = -{self.cache_kib}")
+        try:
+            yield connection
+        finally:
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(connection)
+            else:
+                connection.close()
+
+    def _execute(self, sql: str, params: Optional[List[Any]] = None) -> List[Tuple]:
+        self.load()
+        with self._connection() as connection:
+            return connection.execute(sql, params or []).fetchall()
+
+    def _distinct(self, field: str, where: str = '1', params: Optional[List[Any]] = None) -> List[Any]:
+        # Phrased over the sort expression so its index answers without a table scan
+        expression = _sort_expression(field)
+        rows = self._execute(
+            f"SELECT DISTINCT {expression} AS value FROM records WHERE {where} "
+            f"AND value != '' ORDER BY value",
+            params
+        )
+        return [row[0] for row in rows]
+
+    def _where(self, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Translate filters into a parameterized WHERE clause over indexed columns"""
+        self.load()
+        clauses = []
+        params: List[Any] = []
+        for _, field, op, value in iter_filter_steps(filters):
+            if op == 'eq':
+                clauses.append(f"{field}_key = ?")
+                params.append(value.lower())
+            elif op == 'contains':
+                # Resolve the substring against distinct values so the index is used
+                keys = [key for key in self._value_counts[field] if value.lower() in key]
+                if not keys:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{field}_key IN ({', '.join('?' for _ in keys)})")
+                params.extend(keys)
+            else:
+                clauses.append(f"{field} {'>=' if op == 'gte' else '<='} ?")
+                params.append(value)
+
+        return ' AND '.join(clauses) or '1', params
+
+    def _is_current(self, source_version: Optional[str]) -> bool:
+        """Whether the database file exists and was built from the current data"""
+        if not os.path.exists(self.db_path):
+            return False
+        try:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return False
+
+        if meta.get('schema_version') != SCHEMA_VERSION:
+            return False
+        # Without the JSON source the existing database is the dataset
+        return source_version is None or meta.get('data_version') == source_version
+
+    def _build(self, source_version: Optional[str]) -> None:
+        """Stream the JSON data file into a fresh database, then swap it in"""
+        if source_version is None:
+            raise FileNotFoundError(f"COVID data file not found: {self.data_parser.file_path}")
+
+        # A private file in the target directory, so the final rename is atomic
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.db_path) + '.', suffix='.tmp',
+            dir=os.path.dirname(os.path.abspath(self.db_path))
+        )
+        os.close(fd)
+        try:
+            self._write_database(tmp_path, source_version)
+            os.replace(tmp_path, self.db_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_database(self, tmp_path: str, source_version: str) -> None:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.execute(_CREATE_TABLE)
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+
+            columns = RECORD_FIELDS + KEY_COLUMNS
+            insert = (
+                f"INSERT INTO records ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})"
+            )
+
+            self._importing = True
+            try:
+                records = self.data_parser.iter_records()
+                while True:
+                    batch = list(islice(records, INSERT_BATCH_ROWS))
+                    if not batch:
+                        break
+                    connection.executemany(insert, (
+                        tuple(r[c] for c in RECORD_FIELDS)
+                        + tuple(r[f].lower() if r[f] else None for f in INDEXED_FIELDS)
+                        for r in batch
+                    ))
+            finally:
+                self._importing = False
+
+            self.phase = 'indexing'
+            for statement in _index_statements():
+                connection.execute(statement)
+            connection.execute("ANALYZE")
+
+            connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ('schema_version', SCHEMA_VERSION),
+                ('data_version', source_version),
+                ('source_path', os.path.abspath(self.data_parser.file_path)),
+            ])
+            connection.commit()
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _build_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock shared by every process building this database"""
+        if fcntl is None:
+            yield
+            return
+
+        with open(f"{self.db_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _collect_statistics(self) -> None:
+        connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            self.data_version = meta.get('data_version')
+            self.total_records = connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            self.distinct_months = connection.execute(
+                "SELECT COUNT(DISTINCT date) FROM records"
+            ).fetchone()[0]
+
+            value_counts = {}
+            for field, column in zip(INDEXED_FIELDS, KEY_COLUMNS):
+                value_counts[field] = dict(connection.execute(
+                    f"SELECT {column}, COUNT(*) FROM records WHERE {column} IS NOT NULL GROUP BY {column}"
+                ).fetchall())
+            self._value_counts = value_counts
+
+            step = max(1, self.total_records // SIZE_SAMPLE_ROWS)
+            sample = [
+                dict(zip(RECORD_FIELDS, row)) for row in connection.execute(
+                    f"SELECT {', '.join(RECORD_FIELDS)} FROM records WHERE id % ? = 0 LIMIT ?",
+                    (step, SIZE_SAMPLE_ROWS)
+                )
+            ]
+            self.record_bytes = len(json.dumps(sample)) // len(sample) if sample else 0
+        finally:
+            connection.close()
@@ -0,0 +1,232 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being queued"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class QueryCost:
+    """Predicted work for a request: rows touched and response bytes"""
+
+    def __init__(self, rows_touched: int = 0, bytes_out: int = 0):
+        self.rows_touched = rows_touched
+        self.bytes_out = bytes_out
+
+
+class TokenBucket:
+    """Refilling token bucket; callers take a variable number of tokens"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, tokens: float) -> float:
+        """Take tokens if available; otherwise return seconds until they would be"""
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (tokens - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class EndpointClass:
+    """Concurrency and in-flight response byte budget shared by similar endpoints"""
+
+    def __init__(self, name: str, max_concurrency: int, max_bytes: int, rate_limited: bool = True):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_bytes = max_bytes
+        # Whether requests are also charged to the client's token bucket
+        self.rate_limited = rate_limited
+        self.active = 0
+        self.active_bytes = 0
+
+
+class Ticket:
+    """Admission for one request; releases its budget when the request finishes"""
+
+    def __init__(self, controller: 'AdmissionController', endpoint_class: Optional[EndpointClass],
+                 bytes_out: int):
+        self._controller = controller
+        self._endpoint_class = endpoint_class
+        self._bytes_out = bytes_out
+
+    def __enter__(self) -> 'Ticket':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def release(self) -> None:
+        if self._endpoint_class is not None:
+            self._controller._release(self._endpoint_class, self._bytes_out)
+            self._endpoint_class = None
+
+
+# Default budgets: (max concurrent requests, max in-flight response bytes,
+# charged to the client's rate). Cheap requests are exempt from the rate so
+# that heavy pulls cannot starve a client's filter and summary lookups.
+DEFAULT_CLASSES = {
+    'cheap': (32, 16 * 1024 * 1024, False),
+    'search': (16, 16 * 1024 * 1024, True),
+    'bulk': (4, 128 * 1024 * 1024, True),
+}
+
+
+class AdmissionController:
+    """Admits or sheds requests by endpoint class budgets and per-client rate.
+
+    Each request must fit within its endpoint class's concurrency and
+    in-flight byte budgets. With per-client limiting on, requests in
+    rate-limited classes are also charged tokens from their client's bucket
+    in proportion to their predicted cost. Requests that do not fit are
+    rejected at once (429 for clients over their rate, 503 for saturated
+    classes) with a Retry-After hint rather than waiting for capacity.
+
+    Clients are told apart by address, or by client_id_header when the app
+    runs behind a proxy that sets it. Per-client limiting is off by default,
+    since behind a proxy without that header every user shares one address.
+    """
+
+    # Prune idle client buckets once this many are tracked
+    MAX_TRACKED_CLIENTS = 10000
+
+    def __init__(self,
+                 classes: Optional[Dict[str, EndpointClass]] = None,
+                 client_rate: float = 10.0,
+                 client_burst: float = 40.0,
+                 rows_per_token: int = 50000,
+                 bytes_per_token: int = 4 * 1024 * 1024,
+                 enabled: bool = True,
+                 client_limit: bool = False,
+                 client_id_header: Optional[str] = None):
+        if classes is None:
+            classes = {
+                name: EndpointClass(name, concurrency, max_bytes, rate_limited)
+                for name, (concurrency, max_bytes, rate_limited) in DEFAULT_CLASSES.items()
+            }
+        self.classes = classes
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.rows_per_token = rows_per_token
+        self.bytes_per_token = bytes_per_token
+        self.enabled = enabled
+        self.client_limit = client_limit
+        self.client_id_header = client_id_header
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        """Build a controller from COVID_ADMISSION* / COVID_CLIENT_* settings"""
+        classes = {}
+        for name, (concurrency, max_bytes, rate_limited) in DEFAULT_CLASSES.items():
+            prefix = f"COVID_{name.upper()}"
+            classes[name] = EndpointClass(
+                name,
+                int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+                int(os.getenv(f"{prefix}_MAX_BYTES", max_bytes)),
+                rate_limited
+            )
+
+        return cls(
+            classes=classes,
+            client_rate=float(os.getenv('COVID_CLIENT_RATE', 10.0)),
+            client_burst=float(os.getenv('COVID_CLIENT_BURST', 40.0)),
+            rows_per_token=int(os.getenv('COVID_ROWS_PER_TOKEN', 50000)),
+            bytes_per_token=int(os.getenv('COVID_BYTES_PER_TOKEN', 4 * 1024 * 1024)),
+            enabled=os.getenv('COVID_ADMISSION', '1') != '0',
+            client_limit=os.getenv('COVID_CLIENT_LIMIT', '0') != '0',
+            client_id_header=os.getenv('COVID_CLIENT_ID_HEADER') or None
+        )
+
+    def tokens_for(self, cost: Optional[QueryCost]) -> float:
+        """Tokens charged for a request: one, plus its predicted work"""
+        tokens = 1.0
+        if cost is not None:
+            tokens += cost.rows_touched / self.rows_per_token
+            tokens += cost.bytes_out / self.bytes_per_token
+        # A single request may never need more than a full bucket
+        return min(tokens, self.client_burst)
+
+    def acquire(self, endpoint_class: str, client_id: str,
+                cost: Optional[QueryCost] = None) -> Ticket:
+        """Admit a request or raise AdmissionRejected without waiting"""
+        if not self.enabled:
+            return Ticket(self, None, 0)
+
+        budget = self.classes[endpoint_class]
+        bytes_out = cost.bytes_out if cost is not None else 0
+
+        with self._lock:
+            # Check capacity before charging, so a shed request costs the client nothing
+            over_concurrency = budget.active >= budget.max_concurrency
+            # An oversized request may still run alone rather than never running
+            over_bytes = budget.active > 0 and budget.active_bytes + bytes_out > budget.max_bytes
+            if over_concurrency or over_bytes:
+                limit = 'concurrency' if over_concurrency else 'response byte'
+                raise AdmissionRejected(
+                    503, f"Server busy: {budget.name} endpoint {limit} budget exhausted", 1
+                )
+
+            if self.client_limit and budget.rate_limited:
+                bucket = self._bucket_for(client_id)
+                wait = bucket.try_take(self.tokens_for(cost))
+                if wait > 0:
+                    retry_after = 60 if math.isinf(wait) else max(1, math.ceil(wait))
+                    raise AdmissionRejected(429, "Too many requests: client rate limit exceeded", retry_after)
+
+            budget.active += 1
+            budget.active_bytes += bytes_out
+
+        return Ticket(self, budget, bytes_out)
+
+    def get_status(self) -> Dict[str, Dict[str, int]]:
+        """Current usage of each endpoint class budget"""
+        with self._lock:
+            return {
+                name: {
+                    'active': budget.active,
+                    'max_concurrency': budget.max_concurrency,
+                    'active_bytes': budget.active_bytes,
+                    'max_bytes': budget.max_bytes
+                }
+                for name, budget in self.classes.items()
+            }
+
+    def _bucket_for(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_TRACKED_CLIENTS:
+                # Full buckets carry no state worth keeping
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full()}
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._buckets[client_id] = bucket
+        return bucket
+
+    def _release(self, budget: EndpointClass, bytes_out: int) -> None:
+        with self._lock:
+            budget.active -= 1
+            budget.active_bytes -= bytes_out
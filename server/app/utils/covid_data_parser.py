@@ -1,9 +1,25 @@
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
 
 
+# Fields of a parsed record, in response order
+RECORD_FIELDS = (
+    'id', 'state', 'season', 'year_month', 'year', 'month', 'date', 'month_name',
+    'formatted_date', 'age_category', 'sex', 'race', 'monthly_rate', 'rate_type'
+)
+
+# Categorical fields that get a value index at load time
+INDEXED_FIELDS = ('state', 'season', 'age_category', 'sex', 'race')
+
+# How often (in rows) parsing progress is published
+PROGRESS_INTERVAL = 5000
+
+
 class CovidDataParser:
     """Utility class for parsing and processing COVID-19 hospitalization data"""
     
@@ -11,6 +27,20 @@ class CovidDataParser:
         self.file_path = file_path
         self._raw_data = None
         self._parsed_data = None
+        # Guards the one-time load so concurrent cold-start requests parse once
+        self._load_lock = threading.Lock()
+        
+        # Value indexes: field -> lower-cased value -> ascending record positions
+        self._value_index: Dict[str, Dict[str, List[int]]] = {}
+        self._distinct_values: Dict[str, List[str]] = {}
+        
+        # Load progress, readable from other threads without taking the lock
+        self.phase = 'idle'
+        self.rows_total = 0
+        self.rows_parsed = 0
+        self.load_error: Optional[str] = None
+        self.data_version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
     
     def _load_raw_data(self) -> Dict[str, Any]:
         """Load raw JSON data from file"""
@@ -81,13 +111,114 @@ class CovidDataParser:
         if self._parsed_data is not None:
             return self._parsed_data
         
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            if self._parsed_data is None:
+                try:
+                    self.load_error = None
+                    self.phase = 'reading'
+                    self.data_version = self.compute_data_version()
+                    records = list(self.iter_records())
+                    
+                    self.phase = 'indexing'
+                    self._build_indexes(records)
+                    
+                    self._parsed_data = records
+                    self.loaded_at = time.time()
+                    self.phase = 'ready'
+                except Exception as e:
+                    self.phase = 'error'
+                    self.load_error = str(e)
+                    raise
+        
+        return self._parsed_data
+    
+    def is_loaded(self) -> bool:
+        """Whether the dataset has been parsed and indexed"""
+        return self._parsed_data is not None
+    
+    def get_load_status(self) -> Dict[str, Any]:
+        """Report load phase and progress without triggering a load"""
+        if self.phase == 'ready':
+            progress = 1.0
+        elif self.phase == 'parsing' and self.rows_total:
+            progress = self.rows_parsed / self.rows_total
+        else:
+            progress = 0.0
+        
+        return {
+            'phase': self.phase,
+            'progress': round(progress, 4),
+            'rows_parsed': self.rows_parsed,
+            'rows_total': self.rows_total,
+            'data_version': self.data_version,
+            'loaded_at': self.loaded_at,
+            'error': self.load_error
+        }
+    
+    def compute_data_version(self) -> Optional[str]:
+        """Identify the data file contents by path, size and modification time"""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        
+        fingerprint = f"{os.path.abspath(self.file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12]
+    
+    def _build_indexes(self, records: List[Dict[str, Any]]) -> None:
+        """Build per-field value indexes and distinct value lists"""
+        value_index = {field: {} for field in INDEXED_FIELDS}
+        distinct = {field: set() for field in INDEXED_FIELDS}
+        
+        for position, record in enumerate(records):
+            for field in INDEXED_FIELDS:
+                value = record[field]
+                if not value:
+                    continue
+                value_index[field].setdefault(value.lower(), []).append(position)
+                distinct[field].add(value)
+        
+        self._value_index = value_index
+        self._distinct_values = {field: sorted(values) for field, values in distinct.items()}
+    
+    def get_value_index(self, field: str) -> Dict[str, List[int]]:
+        """Get the lower-cased value -> record positions index for a field"""
+        self.parse_data()
+        return self._value_index[field]
+    
+    def get_distinct_values(self, field: str) -> List[str]:
+        """Get the sorted distinct non-empty values of an indexed field"""
+        self.parse_data()
+        return self._distinct_values[field]
+    
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield record dictionaries parsed from the raw file, tracking progress.
+        
+        Records are not retained, so storage backends can stream them; the raw
+        JSON is released once iteration finishes.
+        """
         raw_data = self._load_raw_data()
         data_rows = raw_data.get('data', [])
         column_mapping = self._get_column_mapping()
         
-        parsed_records = []
+        self.rows_total = len(data_rows)
+        self.rows_parsed = 0
+        self.phase = 'parsing'
         
+        try:
+            yield from self._iter_rows(data_rows)
+        finally:
+            self._raw_data = None
+        
+        self.rows_parsed = self.rows_total
+    
+    def _iter_rows(self, data_rows: List[List[Any]]) -> Iterator[Dict[str, Any]]:
+        """Convert raw data rows into record dictionaries"""
         for i, row in enumerate(data_rows):
+            if i % PROGRESS_INTERVAL == 0:
+                self.rows_parsed = i
+            
             if len(row) < 8:  # Skip incomplete rows
                 continue
             
@@ -117,14 +248,11 @@ class CovidDataParser:
                     'rate_type': visible_data[7] if len(visible_data) > 7 else 'Crude Rate'
                 }
                 
-                parsed_records.append(record)
-                
             except (IndexError, ValueError) as e:
                 print(f"Error parsing row {i}: {e}")
                 continue
-        
-        self._parsed_data = parsed_records
-        return self._parsed_data
+            
+            yield record
     
     def _parse_rate(self, rate_str: str) -> Optional[float]:
         """Parse rate string to float"""
@@ -137,33 +265,28 @@ class CovidDataParser:
     
     def get_unique_states(self) -> List[str]:
         """Get list of unique states"""
-        data = self.parse_data()
-        states = list(set(record['state'] for record in data if record['state']))
-        return sorted(states)
+        self.parse_data()
+        return list(self._distinct_values['state'])
     
     def get_unique_seasons(self) -> List[str]:
         """Get list of unique seasons"""
-        data = self.parse_data()
-        seasons = list(set(record['season'] for record in data if record['season']))
-        return sorted(seasons)
+        self.parse_data()
+        return list(self._distinct_values['season'])
     
     def get_unique_age_categories(self) -> List[str]:
         """Get list of unique age categories"""
-        data = self.parse_data()
-        categories = list(set(record['age_category'] for record in data if record['age_category']))
-        return sorted(categories)
+        self.parse_data()
+        return list(self._distinct_values['age_category'])
     
     def get_unique_sex(self) -> List[str]:
         """Get list of unique sex values"""
-        data = self.parse_data()
-        sex_values = list(set(record['sex'] for record in data if record['sex']))
-        return sorted(sex_values)
+        self.parse_data()
+        return list(self._distinct_values['sex'])
     
     def get_unique_race(self) -> List[str]:
         """Get list of unique race values"""
-        data = self.parse_data()
-        race_values = list(set(record['race'] for record in data if record['race']))
-        return sorted(race_values)
+        self.parse_data()
+        return list(self._distinct_values['race'])
     
     def get_date_range(self) -> Dict[str, Any]:
         """Get the date range of the data"""
@@ -0,0 +1,98 @@
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.covid_data_parser import RECORD_FIELDS
+
+# Response shapes for record lists: one object per record, or column arrays
+RESPONSE_FORMATS = ('records', 'compact')
+
+# String fields with few distinct values; the compact format sends each value
+# once in a lookup table and references it by position
+DICTIONARY_FIELDS = frozenset((
+    'state', 'season', 'year_month', 'date', 'month_name', 'formatted_date',
+    'age_category', 'sex', 'race', 'rate_type'
+))
+
+
+def parse_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated fields= parameter; None means every field"""
+    if not value:
+        return None
+
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in RECORD_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        if field not in fields:
+            fields.append(field)
+
+    return tuple(fields) or None
+
+
+def parse_format(value: Optional[str]) -> str:
+    """Validate a format= parameter, defaulting to one object per record"""
+    if not value:
+        return 'records'
+    if value not in RESPONSE_FORMATS:
+        raise ValueError(f"Unknown format: {value}")
+    return value
+
+
+def project_records(records: List[Dict[str, Any]],
+                    fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Keep only the requested fields of each record"""
+    if fields is None:
+        return records
+    return [{field: record[field] for field in fields} for record in records]
+
+
+def encode_compact(records: List[Dict[str, Any]],
+                   fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Encode records as column arrays with dictionary-coded categorical fields.
+
+    Record i is rebuilt as {f: columns[f][i]} for plain fields and
+    {f: dictionaries[f][columns[f][i]]} for fields listed in dictionaries.
+    """
+    fields = tuple(fields or RECORD_FIELDS)
+    columns = {}
+    dictionaries = {}
+
+    # One pass over the records, transposed into columns
+    if len(fields) == 1:
+        transposed = [list(map(itemgetter(fields[0]), records))]
+    else:
+        transposed = list(zip(*map(itemgetter(*fields), records))) or [()] * len(fields)
+
+    for field, column in zip(fields, transposed):
+        column = list(column)
+        if field in DICTIONARY_FIELDS:
+            # Codes follow first appearance, so the table order is deterministic
+            values = list(dict.fromkeys(column))
+            codes = {value: code for code, value in enumerate(values)}
+            column = list(map(codes.__getitem__, column))
+            dictionaries[field] = values
+        columns[field] = column
+
+    return {
+        'format': 'compact',
+        'length': len(records),
+        'fields': list(fields),
+        'columns': columns,
+        'dictionaries': dictionaries
+    }
+
+
+def shape_records(records: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None,
+                  response_format: str = 'records') -> Any:
+    """Apply projection and the requested response format to a record list"""
+    if response_format == 'compact':
+        return encode_compact(records, fields)
+    return project_records(records, fields)
+
+
+def projected_fraction(fields: Optional[Sequence[str]]) -> float:
+    """Share of a full record's fields kept by a projection"""
+    return 1.0 if fields is None else len(fields) / len(RECORD_FIELDS)
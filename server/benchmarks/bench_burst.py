@@ -0,0 +1,177 @@
+"""Measure server CPU for bursts of identical requests against a single request.
+
+Starts the app (see load_test.py) with the result cache disabled, so every
+request is cold, and the default admission control, so a burst shows whether
+identical requests are admitted once or shed. For each query it alternates one request with N identical concurrent
+requests and compares the server CPU they cost. With request coalescing a
+burst costs one computation plus N responses, not N computations. Usage
+(from the server directory):
+
+    python -m benchmarks.bench_burst --data ../data/rows.json --burst 16
+    python -m benchmarks.bench_burst --cold-start --json burst.json
+
+--cold-start also compares one and N identical first requests against
+freshly started servers without warm-up, so the burst includes the dataset
+load itself. Server CPU is read from /proc (Linux only).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import SplitResult, urlsplit
+
+from benchmarks.load_test import ProcessMonitor, _free_port, _request, start_server, wait_until_ready
+
+# Every request is cold
+SERVER_ENV = {'COVID_RESULT_CACHE_SIZE': '0'}
+
+# (name, path, query)
+QUERIES = [
+    ('trends', '/api/covid/trends', {}),
+    ('trends_filtered', '/api/covid/trends', {'sex': 'Female', 'min_rate': 1.0}),
+    ('all_records', '/api/covid/all-records', {'age_category': 'All'}),
+]
+
+
+def _fire(base: SplitResult, path: str, query: Dict[str, Any], count: int,
+          timeout: float) -> List[Optional[int]]:
+    """Send count identical requests at once and return their statuses"""
+    statuses: List[Optional[int]] = [None] * count
+    barrier = threading.Barrier(count)
+
+    def send(n: int) -> None:
+        barrier.wait()
+        statuses[n] = _request(base, path, query, timeout)[0]
+
+    threads = [threading.Thread(target=send, args=(n,), name=f"burst-{n}") for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def _measure(pid: int, base: SplitResult, path: str, query: Dict[str, Any], count: int,
+             timeout: float) -> Tuple[float, float, int]:
+    """Server CPU seconds, wall seconds and failed requests for one burst"""
+    # Only the start and stop samples are needed
+    monitor = ProcessMonitor(pid, interval=3600)
+    monitor.start()
+    started = time.perf_counter()
+    statuses = _fire(base, path, query, count, timeout)
+    wall = time.perf_counter() - started
+    monitor.stop()
+    failed = sum(1 for status in statuses if status != 200)
+    return monitor.samples[-1][1] - monitor.samples[0][1], wall, failed
+
+
+def _summary(single: List[Tuple[float, float, int]], burst: List[Tuple[float, float, int]],
+             count: int) -> Dict[str, Any]:
+    single_cpu = statistics.median(run[0] for run in single)
+    burst_cpu = statistics.median(run[0] for run in burst)
+    return {
+        'single_cpu_ms': round(single_cpu * 1000, 1),
+        'burst_cpu_ms': round(burst_cpu * 1000, 1),
+        # 1.0 when a burst costs the same as one request; count when nothing is shared
+        'cpu_ratio': round(burst_cpu / single_cpu, 2) if single_cpu else None,
+        'single_wall_ms': round(statistics.median(run[1] for run in single) * 1000, 1),
+        'burst_wall_ms': round(statistics.median(run[1] for run in burst) * 1000, 1),
+        'failed': sum(run[2] for run in single + burst),
+        'burst': count,
+    }
+
+
+def _run_queries(args, server_env: Dict[str, str]) -> Dict[str, Any]:
+    port = _free_port()
+    base = urlsplit(f"http://127.0.0.1:{port}")
+    server = start_server(args.data, port, server_env)
+    try:
+        wait_until_ready(base, args.ready_timeout)
+        results = {}
+        for name, path, query in QUERIES:
+            single, burst = [], []
+            for _ in range(args.rounds):
+                single.append(_measure(server.pid, base, path, query, 1, args.timeout))
+                burst.append(_measure(server.pid, base, path, query, args.burst, args.timeout))
+            results[name] = _summary(single, burst, args.burst)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _cold_request(args, server_env: Dict[str, str], count: int) -> Tuple[float, float, int]:
+    port = _free_port()
+    base = urlsplit(f"http://127.0.0.1:{port}")
+    server = start_server(args.data, port, {**server_env, 'COVID_WARM_UP': '0'})
+    try:
+        # Without warm-up nothing loads the data before the first request, so the
+        # server is not ready yet; wait only until it accepts requests
+        deadline = time.monotonic() + args.ready_timeout
+        while _request(base, '/api/covid/live', {}, 5)[0] != 200:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server not live after {args.ready_timeout:.0f}s")
+            time.sleep(0.1)
+        _, path, query = QUERIES[0]
+        return _measure(server.pid, base, path, query, count, args.timeout)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json'))
+    parser.add_argument('--burst', type=int, default=16, help='Identical requests per burst')
+    parser.add_argument('--rounds', type=int, default=5, help='Single/burst pairs per query')
+    parser.add_argument('--cold-start', action='store_true',
+                        help='Also burst the first request of a server without warm-up')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Per-request timeout in seconds')
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    parser.add_argument('--server-env', nargs='*', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the started servers')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this file')
+    args = parser.parse_args()
+
+    if not ProcessMonitor.available():
+        raise SystemExit('Server CPU is read from /proc, which is not available here')
+
+    server_env = {**SERVER_ENV, **dict(item.split('=', 1) for item in args.server_env)}
+    results = _run_queries(args, server_env)
+    if args.cold_start:
+        single = _cold_request(args, server_env, 1)
+        burst = _cold_request(args, server_env, args.burst)
+        results['cold_start_trends'] = _summary([single], [burst], args.burst)
+
+    header = (f"{'query':<20}{'single cpu ms':>15}{f'x{args.burst} cpu ms':>15}{'ratio':>8}"
+              f"{'single ms':>12}{f'x{args.burst} ms':>12}{'failed':>8}")
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        print(
+            f"{name:<20}{result['single_cpu_ms']:>15.1f}{result['burst_cpu_ms']:>15.1f}"
+            f"{result['cpu_ratio'] or 0:>8.2f}{result['single_wall_ms']:>12.1f}"
+            f"{result['burst_wall_ms']:>12.1f}{result['failed']:>8}"
+        )
+    print()
+    print(f"cpu_count {os.cpu_count()}  (ratio 1.0: a burst costs one request; "
+          f"{args.burst}.0: nothing is shared)")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'data': os.path.abspath(args.data),
+                'burst': args.burst,
+                'rounds': args.rounds,
+                'server_env': server_env,
+                'cpu_count': os.cpu_count(),
+                'queries': results
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
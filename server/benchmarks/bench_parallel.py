@@ -0,0 +1,113 @@
+"""Measure partitioned parallel execution against the serial in-memory backend.
+
+One dataset load is shared by every configuration; each configuration swaps
+in a freshly prepared executor. Usage (from the server directory):
+
+    python -m benchmarks.bench_parallel --data ../data/rows.json
+    python -m benchmarks.bench_parallel --workers 2 4 8 --partitions-per-worker 1 2 --json results.json
+
+Speedup is bounded by the cores actually available (os.cpu_count() is
+reported with the results).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Scan-heavy queries: (name, backend method, keyword arguments)
+QUERIES = [
+    ('page_unfiltered_by_rate', 'search', {'sort_by': 'rate', 'offset': 0, 'limit': 50}),
+    ('page_deep_by_state', 'search', {'sort_by': 'state', 'sort_order': 'asc', 'offset': 10000, 'limit': 50}),
+    ('search_date_range', 'search', {'start_date': '2021-01-01', 'end_date': '2021-12-31', 'offset': 0, 'limit': 50}),
+    ('search_rate', 'search', {'min_rate': 5.0, 'sort_by': 'rate', 'offset': 0, 'limit': 50}),
+    ('query_multi', 'query', {'sex': 'Female', 'min_rate': 1.0}),
+    ('trends_unfiltered', 'trends', {}),
+    ('trends_rate', 'trends', {'min_rate': 1.0}),
+]
+
+
+def _time(call, kwargs, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call(**kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--partitions-per-worker', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', dest='json_path', help='Also write results to this file')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.storage import MemoryBackend, PartitionedExecutor
+
+    backend = MemoryBackend(args.data)
+    backend.load()
+    records = backend.data_parser.parse_data()
+
+    serial = {name: _time(getattr(backend, method), kwargs, args.repeat)
+              for name, method, kwargs in QUERIES}
+
+    runs = []
+    for workers in args.workers:
+        for per_worker in args.partitions_per_worker:
+            # min_rows=0 forces every query through the pool
+            executor = PartitionedExecutor(workers, workers * per_worker, 0)
+            started = time.perf_counter()
+            executor.prepare(records)
+            prepare_seconds = time.perf_counter() - started
+
+            backend.executor = executor
+            try:
+                timings = {name: _time(getattr(backend, method), kwargs, args.repeat)
+                           for name, method, kwargs in QUERIES}
+            finally:
+                backend.executor = None
+                executor.close()
+
+            runs.append({
+                'workers': workers,
+                'partitions': workers * per_worker,
+                'prepare_seconds': round(prepare_seconds, 3),
+                'queries': {
+                    name: {'p50_ms': round(ms, 3), 'speedup': round(serial[name] / ms, 2) if ms else None}
+                    for name, ms in timings.items()
+                }
+            })
+
+    header = f"{'query':<26}{'serial ms':>11}" + ''.join(
+        f"{'%dw/%dp' % (run['workers'], run['partitions']):>16}" for run in runs
+    )
+    print(header)
+    print('-' * len(header))
+    for name, _, _ in QUERIES:
+        row = f"{name:<26}{serial[name]:>11.2f}"
+        for run in runs:
+            timing = run['queries'][name]
+            row += f"{timing['p50_ms']:>9.2f} x{timing['speedup']:<5.2f}"
+        print(row)
+    print()
+    print(f"records {len(records)}  cpu_count {os.cpu_count()}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'data': os.path.abspath(args.data),
+                'records': len(records),
+                'cpu_count': os.cpu_count(),
+                'repeat': args.repeat,
+                'serial': {name: {'p50_ms': round(ms, 3)} for name, ms in serial.items()},
+                'runs': runs
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
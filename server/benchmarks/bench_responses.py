@@ -0,0 +1,94 @@
+"""Measure response size and encode time for each record response shape.
+
+Encodes the record lists of typical dashboard queries as full records,
+projected records (fields=), compact columns (format=compact) and both,
+using the same JSON settings as the API. Usage (from the server directory):
+
+    python -m benchmarks.bench_responses --data ../data/rows.json
+    python -m benchmarks.bench_responses --repeat 20 --json responses.json
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+# Columns the Data page table renders, and what the HeatMap page aggregates
+TABLE_FIELDS = ('id', 'state', 'season', 'date', 'age_category', 'sex', 'race', 'monthly_rate')
+HEATMAP_FIELDS = ('state', 'monthly_rate')
+
+# (name, service method, keyword arguments, projection used by the page)
+QUERIES = [
+    ('data_page', 'advanced_search', {'page': 1, 'per_page': 50}, TABLE_FIELDS),
+    ('data_page_max', 'advanced_search', {'page': 1, 'per_page': 100, 'sort_by': 'rate'}, TABLE_FIELDS),
+    ('heatmap_state', 'get_all_records_no_pagination', {'state': 'California'}, HEATMAP_FIELDS),
+    ('heatmap_all', 'get_all_records_no_pagination', {}, HEATMAP_FIELDS),
+]
+
+
+def _dumps(payload) -> bytes:
+    # Flask's default provider outside debug mode: sorted keys, compact separators
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json'))
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', dest='json_path', help='Also write results to this file')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services.covid_service import CovidService
+    from app.utils.record_encoding import shape_records
+
+    service = CovidService(args.data)
+    service.backend.load()
+
+    results = {}
+    for name, method, kwargs, fields in QUERIES:
+        result = getattr(service, method)(**kwargs)
+        records = result['data'] if isinstance(result, dict) else result
+
+        shapes = {
+            'records': (None, 'records'),
+            'projected': (fields, 'records'),
+            'compact': (None, 'compact'),
+            'compact_projected': (fields, 'compact'),
+        }
+        results[name] = {'rows': len(records)}
+        for shape, (shape_fields, response_format) in shapes.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                body = _dumps({'data': shape_records(records, shape_fields, response_format)})
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name][shape] = {
+                'bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body, 6)),
+                'encode_ms': round(statistics.median(timings), 3)
+            }
+
+    header = f"{'query':<16}{'rows':>7}" + ''.join(
+        f"{shape:>30}" for shape in ('records', 'projected', 'compact', 'compact_projected')
+    )
+    print(header)
+    print(f"{'':<23}" + f"{'KiB / gzip KiB / ms':>30}" * 4)
+    print('-' * len(header))
+    for name, result in results.items():
+        row = f"{name:<16}{result['rows']:>7}"
+        for shape in ('records', 'projected', 'compact', 'compact_projected'):
+            size = result[shape]
+            row += f"{size['bytes'] / 1024:>12.1f} /{size['gzip_bytes'] / 1024:>7.1f} /{size['encode_ms']:>7.2f}"
+        print(row)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({'data': os.path.abspath(args.data), 'repeat': args.repeat, 'queries': results},
+                      file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
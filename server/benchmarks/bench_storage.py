@@ -0,0 +1,141 @@
+"""Compare query latency and memory across storage backends.
+
+Each backend runs in its own subprocess so load time and peak RSS are
+measured in isolation. The *_threaded queries run each call on a new thread,
+as the development server runs each request, so connection setup and cold
+page caches show up in their timings. Usage (from the server directory):
+
+    python -m benchmarks.bench_storage --data ../data/rows.json
+    python -m benchmarks.bench_storage --backends memory sqlite --repeat 50 --json results.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+# Dashboard-shaped queries: (name, service method, keyword arguments)
+QUERIES = [
+    ('page_unfiltered', 'get_all_records', {'page': 1, 'per_page': 50}),
+    ('page_deep_by_rate', 'get_all_records', {'page': 200, 'per_page': 50, 'sort_by': 'rate'}),
+    ('search_state', 'advanced_search', {'state': 'New York'}),
+    ('search_multi', 'advanced_search', {'season': '2021-22', 'sex': 'Female', 'min_rate': 20.0}),
+    ('search_date_range', 'advanced_search', {'start_date': '2021-01-01', 'end_date': '2021-12-31',
+                                              'sort_by': 'state', 'sort_order': 'asc'}),
+    ('state_page', 'search_by_state', {'state': 'new'}),
+    ('state_summary', 'get_state_summary', {'state': 'California'}),
+    ('trends_state', '_trends_uncached', {'state': 'California'}),
+    ('trends_unfiltered', '_trends_uncached', {}),
+    ('all_records_state', 'get_all_records_no_pagination', {'state': 'Maryland'}),
+    ('all_records_unfiltered', 'get_all_records_no_pagination', {}),
+    ('filter_options', '_filter_options_uncached', {}),
+]
+
+# Queries also timed with every call on a fresh thread
+THREADED_QUERIES = ('search_state', 'state_summary', 'trends_state')
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_backend(backend_name: str, data_path: str, repeat: int) -> dict:
+    """Load one backend and time every benchmark query against it"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services.covid_service import CovidService
+    from app.storage import create_backend
+
+    backend = create_backend(data_path, backend_name)
+    service = CovidService(backend=backend)
+
+    started = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - started
+
+    # Bypass the service result cache so every run measures the backend
+    calls = {
+        '_trends_uncached': backend.trends,
+        '_filter_options_uncached': backend.filter_options,
+    }
+
+    def time_call(call, kwargs, threaded):
+        started = time.perf_counter()
+        if threaded:
+            thread = threading.Thread(target=call, kwargs=kwargs)
+            thread.start()
+            thread.join()
+        else:
+            call(**kwargs)
+        return (time.perf_counter() - started) * 1000
+
+    results = {}
+    for name, method, kwargs in QUERIES:
+        call = calls.get(method) or getattr(service, method)
+        for threaded in (False, True) if name in THREADED_QUERIES else (False,):
+            timings = sorted(time_call(call, kwargs, threaded) for _ in range(repeat))
+            results[f"{name}_threaded" if threaded else name] = {
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+                'mean_ms': round(statistics.fmean(timings), 3)
+            }
+
+    return {
+        'backend': backend_name,
+        'load_seconds': round(load_seconds, 3),
+        'total_records': backend.get_load_status()['total_records'],
+        'peak_rss_mib': round(_peak_rss_mib(), 1),
+        'queries': results
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json'))
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', dest='json_path', help='Also write results to this file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.data, args.repeat)))
+        return
+
+    runs = []
+    for backend_name in args.backends:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_storage', '--worker', backend_name,
+             '--data', args.data, '--repeat', str(args.repeat)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    header = f"{'query':<26}" + ''.join(f"{run['backend'] + ' p50/p95 ms':>28}" for run in runs)
+    print(header)
+    print('-' * len(header))
+    for name in runs[0]['queries']:
+        row = f"{name:<26}"
+        for run in runs:
+            timing = run['queries'][name]
+            row += f"{timing['p50_ms']:>18.2f} / {timing['p95_ms']:>7.2f}"
+        print(row)
+    print()
+    for run in runs:
+        print(f"{run['backend']:<8} load {run['load_seconds']:.2f}s  "
+              f"peak RSS {run['peak_rss_mib']:.1f} MiB  records {run['total_records']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({'data': os.path.abspath(args.data), 'repeat': args.repeat, 'runs': runs},
+                      file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
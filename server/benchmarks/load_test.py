@@ -0,0 +1,565 @@
+"""Replay dashboard page loads against the Flask app over HTTP.
+
+Starts the app from create_app() in a separate process (or targets --url),
+waits for readiness, then runs virtual users that each load dashboard pages
+back to back for a fixed duration. Reports throughput, latency percentiles
+and error rates per endpoint and per page, plus server CPU and RSS, as a
+table and optionally as JSON. Usage (from the server directory):
+
+    python -m benchmarks.load_test --data ../data/rows.json --concurrency 8 --duration 30
+    python -m benchmarks.load_test --scenarios data:3 heatmap:1 --json load.json
+    python -m benchmarks.load_test --server-env COVID_PARALLEL_WORKERS=4
+    python -m benchmarks.load_test --server-env COVID_CLIENT_LIMIT=1 --shared-client
+
+Requests carry the page's real parameters, with filter values drawn from
+/api/covid/filters by a seeded generator so runs are repeatable. Each virtual
+user identifies itself as a separate client (the started server reads the
+identity from the header named by COVID_CLIENT_ID_HEADER), so per-client rate
+limits apply per user as they would to real users. Requests shed by admission
+control (429/503) are reported in a section of their own and left out of the
+throughput and latency figures; --shared-client sends every user as one
+client to exercise the shedding path.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import SplitResult, urlencode, urlsplit
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statuses returned by admission control when it sheds load
+SHED_STATUSES = (429, 503)
+
+# Header carrying each virtual user's client identity
+CLIENT_HEADER = 'X-Load-Test-Client'
+
+
+def _pick(rng: random.Random, options: Dict[str, Any], name: str) -> Optional[str]:
+    values = [value for value in options.get(name, []) if value.lower() != 'all']
+    return rng.choice(values) if values else None
+
+
+def _filters(rng: random.Random, options: Dict[str, Any]) -> Dict[str, Any]:
+    """One or two filters, as picked in the Advanced Filters panel"""
+    choices = [
+        ('state', _pick(rng, options, 'states')),
+        ('season', _pick(rng, options, 'seasons')),
+        ('age_category', _pick(rng, options, 'age_categories')),
+        ('sex', _pick(rng, options, 'sex')),
+        ('race', _pick(rng, options, 'race')),
+    ]
+    choices = [choice for choice in choices if choice[1]]
+    return dict(rng.sample(choices, min(len(choices), rng.choice((1, 2)))))
+
+
+# Page loads: each returns the (endpoint, path, query) requests the page sends,
+# in the order its components issue them
+
+def data_page(rng, options):
+    filters = _filters(rng, options)
+    sort_by = rng.choice(('date', 'state', 'rate', 'season', 'age_category', 'sex', 'race'))
+    page = {'page': 1, 'per_page': 50, 'sort_by': sort_by, 'sort_order': rng.choice(('asc', 'desc'))}
+    return [
+        ('/api/covid/filters', '/api/covid/filters', {}),
+        ('/api/covid/facets', '/api/covid/facets', {}),
+        ('/api/covid', '/api/covid', {'page': 1, 'per_page': 50, 'sort_by': 'date', 'sort_order': 'desc'}),
+        # The user applies filters, then pages forward
+        ('/api/covid/facets', '/api/covid/facets', filters),
+        ('/api/covid/search', '/api/covid/search', {**page, **filters}),
+        ('/api/covid/search', '/api/covid/search', {**page, **filters, 'page': 2}),
+    ]
+
+
+def trends_page(rng, options):
+    filters = _filters(rng, options)
+    return [
+        ('/api/covid/filters', '/api/covid/filters', {}),
+        ('/api/covid/facets', '/api/covid/facets', {}),
+        ('/api/covid/trends', '/api/covid/trends', {}),
+        ('/api/covid/facets', '/api/covid/facets', filters),
+        ('/api/covid/trends', '/api/covid/trends', filters),
+    ]
+
+
+def heatmap_page(rng, options):
+    season = _pick(rng, options, 'seasons')
+    return [
+        ('/api/covid/filters', '/api/covid/filters', {}),
+        ('/api/covid/all-records', '/api/covid/all-records', {}),
+        ('/api/covid/all-records', '/api/covid/all-records', {'season': season} if season else {}),
+    ]
+
+
+# The Home page renders static content and makes no API calls
+SCENARIOS = {
+    'data': data_page,
+    'trends': trends_page,
+    'heatmap': heatmap_page,
+}
+
+
+def _percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+def _latency_summary(timings: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(timings)
+    return {
+        'p50_ms': _percentile(ordered, 0.50),
+        'p95_ms': _percentile(ordered, 0.95),
+        'p99_ms': _percentile(ordered, 0.99),
+        'mean_ms': round(statistics.fmean(ordered), 3) if ordered else None,
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+    }
+
+
+class Recorder:
+    """Thread-safe collection of request and page-load samples.
+
+    Shed responses are kept apart from served ones, so throughput and latency
+    describe the requests the server actually handled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.pages: Dict[str, Dict[str, Any]] = {}
+
+    def record_request(self, endpoint: str, status: Optional[int], elapsed_ms: float, size: int) -> None:
+        with self._lock:
+            entry = self.requests.setdefault(
+                endpoint, {'timings': [], 'shed_timings': [], 'statuses': {}, 'bytes': 0}
+            )
+            entry['shed_timings' if status in SHED_STATUSES else 'timings'].append(elapsed_ms)
+            key = str(status) if status is not None else 'connection_error'
+            entry['statuses'][key] = entry['statuses'].get(key, 0) + 1
+            entry['bytes'] += size
+
+    def record_page(self, scenario: str, elapsed_ms: float, failed: bool, shed: bool) -> None:
+        with self._lock:
+            entry = self.pages.setdefault(scenario, {'timings': [], 'failed': 0, 'shed': 0})
+            if shed:
+                entry['shed'] += 1
+            else:
+                entry['timings'].append(elapsed_ms)
+                entry['failed'] += failed
+
+    def report(self, elapsed_seconds: float) -> Dict[str, Any]:
+        endpoints = {}
+        shedding = {}
+        for endpoint, entry in sorted(self.requests.items()):
+            count = len(entry['timings'])
+            shed = len(entry['shed_timings'])
+            errors = sum(
+                n for status, n in entry['statuses'].items()
+                if not status.startswith('2') and status not in map(str, SHED_STATUSES)
+            )
+            endpoints[endpoint] = {
+                'requests': count,
+                'throughput_rps': round(count / elapsed_seconds, 2),
+                'errors': errors,
+                'error_rate': round(errors / count, 4) if count else 0.0,
+                'shed': shed,
+                'statuses': entry['statuses'],
+                'bytes': entry['bytes'],
+                **_latency_summary(entry['timings'])
+            }
+            if shed:
+                shedding[endpoint] = {
+                    'shed': shed,
+                    'shed_rate': round(shed / (count + shed), 4),
+                    **_latency_summary(entry['shed_timings'])
+                }
+
+        pages = {}
+        for scenario, entry in sorted(self.pages.items()):
+            count = len(entry['timings'])
+            pages[scenario] = {
+                'page_loads': count,
+                'throughput_pps': round(count / elapsed_seconds, 2),
+                'failed': entry['failed'],
+                'failure_rate': round(entry['failed'] / count, 4) if count else 0.0,
+                'shed': entry['shed'],
+                **_latency_summary(entry['timings'])
+            }
+
+        total = sum(e['requests'] for e in endpoints.values())
+        errors = sum(e['errors'] for e in endpoints.values())
+        shed = sum(e['shed'] for e in endpoints.values())
+        all_timings = [t for entry in self.requests.values() for t in entry['timings']]
+        if shedding:
+            shedding['total'] = {
+                'shed': shed,
+                'shed_rate': round(shed / (total + shed), 4),
+                **_latency_summary([t for entry in self.requests.values() for t in entry['shed_timings']])
+            }
+        return {
+            'totals': {
+                'requests': total,
+                'throughput_rps': round(total / elapsed_seconds, 2),
+                'errors': errors,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'shed': shed,
+                'shed_rate': round(shed / (total + shed), 4) if total + shed else 0.0,
+                **_latency_summary(all_timings)
+            },
+            'endpoints': endpoints,
+            'pages': pages,
+            'shedding': shedding,
+        }
+
+
+class ProcessMonitor:
+    """Sample CPU and RSS of a server process and its children from /proc (Linux only)"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Tuple[float, float, float]] = []  # (time, cpu seconds, rss MiB)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='load-test-monitor', daemon=True)
+        self._ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._page_mib = (os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096) / (1024 * 1024)
+
+    @staticmethod
+    def available() -> bool:
+        return os.path.exists('/proc/self/stat')
+
+    def start(self) -> None:
+        self._sample()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _pids(self) -> List[int]:
+        # The server plus any worker processes it started (e.g. the parallel pool)
+        pids = [self.pid]
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                stat = self._read_stat(int(entry))
+                if stat is not None and int(stat[1]) == self.pid:
+                    pids.append(int(entry))
+        return pids
+
+    @staticmethod
+    def _read_stat(pid: int) -> Optional[List[str]]:
+        try:
+            with open(f"/proc/{pid}/stat", encoding='utf-8') as file:
+                # Fields after the parenthesized command name, starting at state
+                return file.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            return None
+
+    def _sample(self) -> None:
+        cpu_seconds = 0.0
+        rss_mib = 0.0
+        for pid in self._pids():
+            stat = self._read_stat(pid)
+            if stat is None:
+                continue
+            cpu_seconds += (int(stat[11]) + int(stat[12])) / self._ticks
+            rss_mib += int(stat[21]) * self._page_mib
+        self.samples.append((time.monotonic(), cpu_seconds, rss_mib))
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        if len(self.samples) < 2:
+            return None
+
+        start, end = self.samples[0], self.samples[-1]
+        wall = end[0] - start[0]
+        rates = [
+            (b[1] - a[1]) / (b[0] - a[0]) * 100
+            for a, b in zip(self.samples, self.samples[1:]) if b[0] > a[0]
+        ]
+        rss = [sample[2] for sample in self.samples]
+        return {
+            'cpu_seconds': round(end[1] - start[1], 3),
+            'cpu_percent_mean': round((end[1] - start[1]) / wall * 100, 1) if wall else None,
+            'cpu_percent_peak': round(max(rates), 1) if rates else None,
+            'rss_mib_start': round(rss[0], 1),
+            'rss_mib_mean': round(statistics.fmean(rss), 1),
+            'rss_mib_peak': round(max(rss), 1),
+            'samples': len(self.samples),
+        }
+
+
+def _request(base: SplitResult, path: str, query: Dict[str, Any], timeout: float,
+             headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[int], int]:
+    connection = http.client.HTTPConnection(base.hostname, base.port, timeout=timeout)
+    try:
+        url = f"{path}?{urlencode(query)}" if query else path
+        connection.request('GET', url, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, len(response.read())
+    except (OSError, http.client.HTTPException):
+        return None, 0
+    finally:
+        connection.close()
+
+
+def _get_json(base: SplitResult, path: str, timeout: float) -> Any:
+    connection = http.client.HTTPConnection(base.hostname, base.port, timeout=timeout)
+    try:
+        connection.request('GET', path)
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def run_user(base: SplitResult, scenarios: List[Tuple[str, int]], options: Dict[str, Any], seed: int,
+             deadline: float, recorder: Recorder, timeout: float, think_time: float, client_id: str) -> None:
+    """One virtual user loading pages back to back until the deadline"""
+    rng = random.Random(seed)
+    names = [name for name, _ in scenarios]
+    weights = [weight for _, weight in scenarios]
+    headers = {CLIENT_HEADER: client_id}
+
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        failed = shed = False
+        page_started = time.perf_counter()
+        for endpoint, path, query in SCENARIOS[scenario](rng, options):
+            started = time.perf_counter()
+            status, size = _request(base, path, query, timeout, headers)
+            recorder.record_request(endpoint, status, (time.perf_counter() - started) * 1000, size)
+            shed = shed or status in SHED_STATUSES
+            failed = failed or status is None or not 200 <= status < 300
+        recorder.record_page(scenario, (time.perf_counter() - page_started) * 1000, failed, shed)
+
+        if think_time > 0:
+            # Exponential pauses between page loads, like independent users
+            time.sleep(min(rng.expovariate(1 / think_time), max(0.0, deadline - time.monotonic())))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(data_path: str, port: int, server_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'COVID_DATA_FILE_PATH': os.path.abspath(data_path),
+        # Tell virtual users apart, as a reverse proxy's client header would
+        'COVID_CLIENT_ID_HEADER': CLIENT_HEADER,
+        **server_env
+    }
+    return subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.load_test', '--serve', '--port', str(port)],
+        cwd=SERVER_DIR, env=env
+    )
+
+
+def serve(host: str, port: int) -> None:
+    """Run the app from create_app() on a threaded WSGI server"""
+    sys.path.insert(0, SERVER_DIR)
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # Per-request access logs would dominate the harness output
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    make_server(host, port, create_app(), threaded=True).serve_forever()
+
+
+def wait_until_ready(base: SplitResult, timeout: float) -> float:
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        status, _ = _request(base, '/api/covid/ready', {}, 5)
+        if status == 200:
+            return time.monotonic() - started
+        time.sleep(0.25)
+    raise TimeoutError(f"Server not ready after {timeout:.0f}s")
+
+
+def _parse_scenarios(values: List[str]) -> List[Tuple[str, int]]:
+    scenarios = []
+    for value in values:
+        name, _, weight = value.partition(':')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        scenarios.append((name, int(weight or 1)))
+    return scenarios
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    lines = []
+    columns = f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+
+    header = f"{'endpoint':<26}{'reqs':>7}{'rps':>9}{'err%':>7}{'shed':>6}" + columns
+    lines += [header, '-' * len(header)]
+    rows = list(result['endpoints'].items()) + [('total', result['totals'])]
+    for name, entry in rows:
+        lines.append(
+            f"{name:<26}{entry['requests']:>7}{entry['throughput_rps']:>9.1f}"
+            f"{entry['error_rate'] * 100:>7.1f}{entry['shed']:>6}"
+            f"{entry['p50_ms'] or 0:>10.1f}{entry['p95_ms'] or 0:>10.1f}{entry['p99_ms'] or 0:>10.1f}"
+        )
+    lines.append('')
+
+    header = f"{'page':<26}{'loads':>7}{'pps':>9}{'fail%':>7}{'shed':>6}" + columns
+    lines += [header, '-' * len(header)]
+    for name, entry in result['pages'].items():
+        lines.append(
+            f"{name:<26}{entry['page_loads']:>7}{entry['throughput_pps']:>9.1f}"
+            f"{entry['failure_rate'] * 100:>7.1f}{entry['shed']:>6}"
+            f"{entry['p50_ms'] or 0:>10.1f}{entry['p95_ms'] or 0:>10.1f}{entry['p99_ms'] or 0:>10.1f}"
+        )
+
+    if result['shedding']:
+        lines.append('')
+        header = f"{'shed by admission':<26}{'shed':>7}{'shed%':>9}{'':>13}" + columns
+        lines += [header, '-' * len(header)]
+        for name, entry in result['shedding'].items():
+            lines.append(
+                f"{name:<26}{entry['shed']:>7}{entry['shed_rate'] * 100:>9.1f}{'':>13}"
+                f"{entry['p50_ms'] or 0:>10.1f}{entry['p95_ms'] or 0:>10.1f}{entry['p99_ms'] or 0:>10.1f}"
+            )
+
+    server = result.get('server')
+    if server:
+        lines.append('')
+        lines.append(
+            f"server cpu {server['cpu_seconds']:.1f}s (mean {server['cpu_percent_mean']}%, "
+            f"peak {server['cpu_percent_peak']}%)  rss mean {server['rss_mib_mean']} MiB, "
+            f"peak {server['rss_mib_peak']} MiB"
+        )
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json'))
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS),
+                        help='Page loads to replay, optionally weighted as name:weight')
+    parser.add_argument('--concurrency', type=int, default=4, help='Virtual users')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Mean seconds each user pauses between page loads')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--shared-client', action='store_true',
+                        help='Send every virtual user as one client, to exercise per-client shedding')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    parser.add_argument('--server-env', nargs='*', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the started server')
+    parser.add_argument('--json', dest='json_path', help="Write results to this file ('-' for stdout)")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve('127.0.0.1', args.port)
+        return
+
+    scenarios = _parse_scenarios(args.scenarios)
+    server_env = dict(item.split('=', 1) for item in args.server_env)
+
+    server = None
+    if args.url:
+        base = urlsplit(args.url)
+    else:
+        port = _free_port()
+        base = urlsplit(f"http://127.0.0.1:{port}")
+        server = start_server(args.data, port, server_env)
+
+    monitor = None
+    try:
+        ready_seconds = wait_until_ready(base, args.ready_timeout)
+
+        # Filter values for the scenarios, fetched outside the measured window
+        options = _get_json(base, '/api/covid/filters', args.timeout)
+
+        if server is not None and ProcessMonitor.available():
+            monitor = ProcessMonitor(server.pid)
+            monitor.start()
+
+        recorder = Recorder()
+        started = time.monotonic()
+        deadline = started + args.duration
+        users = [
+            threading.Thread(
+                target=run_user, name=f"load-test-user-{n}",
+                args=(base, scenarios, options, args.seed + n, deadline, recorder,
+                      args.timeout, args.think_time,
+                      'load-test' if args.shared_client else f"load-test-user-{n}")
+            )
+            for n in range(args.concurrency)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = {
+        'started_at': datetime.datetime.fromtimestamp(time.time() - elapsed).isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'config': {
+            'url': args.url,
+            'data': None if args.url else os.path.abspath(args.data),
+            'scenarios': dict(scenarios),
+            'concurrency': args.concurrency,
+            'think_time_seconds': args.think_time,
+            'duration_seconds': args.duration,
+            'seed': args.seed,
+            'shared_client': args.shared_client,
+            'server_env': server_env,
+            'cpu_count': os.cpu_count(),
+            'python': sys.version.split()[0],
+        },
+        'ready_seconds': round(ready_seconds, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        **recorder.report(elapsed),
+        'server': monitor.report() if monitor is not None else None,
+    }
+
+    # Keep stdout clean for the JSON when it is written there
+    print(format_report(result), file=sys.stderr if args.json_path == '-' else sys.stdout)
+    if args.json_path == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
 import os
+from werkzeug.serving import is_running_from_reloader
 from app import create_app
 
-app = create_app()
+# Run directly, the debug reloader keeps this process as a file watcher and
+# serves from a child; only the serving process should load the data
+app = create_app(warm_up=__name__ != "__main__" or is_running_from_reloader())
 
 if __name__ == "__main__":
     host = os.getenv('HOST', '127.0.0.1')
@@ -9,6 +12,7 @@ if __name__ == "__main__":
     
     print("Starting PJMF Flask Server - COVID-19 Data Dashboard...")
     print(f"COVID data: {os.getenv('COVID_DATA_FILE_PATH', '../data/rows.json')}")
+    print(f"Storage backend: {os.getenv('COVID_STORAGE_BACKEND', 'memory')}")
     print(f"Server will be available at: http://{host}:{port}")
     print("\nAPI endpoints:")
     print("   GET    /api/health")
@@ -19,12 +23,16 @@ if __name__ == "__main__":
     print("   GET    /api/covid/trends")
     print("   GET    /api/covid/search")
     print("   GET    /api/covid/filters")
+    print("   GET    /api/covid/facets")
     print("   GET    /api/covid/health")
+    print("   GET    /api/covid/live")
+    print("   GET    /api/covid/ready")
     print("\nQuery parameters:")
     print("   ?page=1, ?per_page=50, ?sort_by=date, ?sort_order=desc")
     print("   ?state=<state>, ?season=<season>, ?age_category=<age>")
     print("   ?sex=<sex>, ?race=<race>, ?min_rate=<num>, ?max_rate=<num>")
     print("   ?start_date=<YYYY-MM-DD>, ?end_date=<YYYY-MM-DD>")
+    print("   ?explain=true, ?fields=<field,...>, ?format=compact")
     print("\n" + "="*60 + "\n")
     
     app.run(host=host, port=port, debug=True)
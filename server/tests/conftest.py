@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+def write_rows_json(path, rows):
+    """Write visible row values as a Socrata rows.json export with 8 hidden metadata columns"""
+    columns = [{'fieldName': f":meta{i}", 'flags': ['hidden']} for i in range(8)]
+    columns += [{'fieldName': name} for name in (
+        'state', 'season', '_yearmonth', 'agecategory_legend', 'sex_label', 'race_label', 'monthlyrate', 'type'
+    )]
+    data = [[f"row-{i}", 'x', 0, 0, None, 0, None, '{}', *row] for i, row in enumerate(rows)]
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'meta': {'view': {'columns': columns}}, 'data': data}, file)
+
+
+@pytest.fixture(scope='session')
+def small_data_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('small') / 'rows.json'
+    write_rows_json(path, [
+        [['Ohio', 'Utah'][i % 2], '2021-22', f"2021{i % 12 + 1:02d}", 'All',
+         ['Male', 'Female', 'All'][i % 3], 'All', f"{i % 50}.5", 'Crude Rate']
+        for i in range(400)
+    ])
+    return str(path)
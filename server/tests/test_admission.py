@@ -0,0 +1,186 @@
+"""Admission control: token buckets, class budgets, rejections and coalesced bulk requests."""
+import threading
+
+import pytest
+
+from app import create_app
+from app.routes import covid
+from app.services.covid_service import CovidService
+from app.utils import admission as admission_module
+from app.utils.admission import AdmissionController, AdmissionRejected, EndpointClass, QueryCost, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission_module.time, 'monotonic', clock)
+    return clock
+
+
+def _controller(concurrency=2, max_bytes=1000, **kwargs):
+    classes = {
+        'cheap': EndpointClass('cheap', 8, 1000, rate_limited=False),
+        'bulk': EndpointClass('bulk', concurrency, max_bytes),
+    }
+    return AdmissionController(classes=classes, **kwargs)
+
+
+def test_token_bucket_takes_refills_and_reports_the_wait(clock):
+    bucket = TokenBucket(rate=2.0, burst=4.0)
+    assert bucket.try_take(3) == 0.0
+    assert bucket.try_take(3) == pytest.approx(1.0)  # 1 token left, 2 more at 2/s
+
+    clock.now += 1.0
+    assert bucket.try_take(3) == 0.0
+    assert not bucket.is_full()
+
+    clock.now += 60
+    assert bucket.is_full()
+
+
+def test_client_over_its_rate_gets_429_with_retry_after(clock):
+    controller = _controller(client_limit=True, client_rate=1.0, client_burst=2.0)
+    for _ in range(2):
+        controller.acquire('bulk', 'a').release()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk', 'a')
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after == 1
+
+    # Other clients have buckets of their own
+    controller.acquire('bulk', 'b').release()
+
+
+def test_costly_requests_take_more_tokens(clock):
+    controller = _controller(client_limit=True, client_rate=1.0, client_burst=10.0, rows_per_token=100)
+    controller.acquire('bulk', 'a', QueryCost(rows_touched=500)).release()  # 1 + 5 tokens
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk', 'a', QueryCost(rows_touched=500))
+    assert (rejected.value.status, rejected.value.retry_after) == (429, 2)
+
+
+def test_client_limit_is_off_by_default(clock):
+    controller = _controller(client_rate=1.0, client_burst=1.0)
+    for _ in range(5):
+        controller.acquire('bulk', 'a').release()
+
+
+def test_cheap_requests_are_not_charged_to_the_client(clock):
+    controller = _controller(client_limit=True, client_rate=1.0, client_burst=1.0)
+    controller.acquire('bulk', 'a').release()
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('bulk', 'a')
+
+    for _ in range(5):
+        controller.acquire('cheap', 'a').release()
+
+
+def test_saturated_class_gets_503(clock):
+    controller = _controller(concurrency=1)
+    ticket = controller.acquire('bulk', 'a')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk', 'b')
+    assert (rejected.value.status, rejected.value.retry_after) == (503, 1)
+    assert 'concurrency' in rejected.value.reason
+
+    ticket.release()
+    controller.acquire('bulk', 'b').release()
+
+
+def test_response_byte_budget_gets_503_but_an_oversized_request_runs_alone(clock):
+    controller = _controller(concurrency=4, max_bytes=1000)
+    ticket = controller.acquire('bulk', 'a', QueryCost(bytes_out=5000))
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('bulk', 'b', QueryCost(bytes_out=10))
+    assert rejected.value.status == 503
+    assert 'response byte' in rejected.value.reason
+    ticket.release()
+
+
+def test_ticket_is_released_when_the_request_raises(clock):
+    controller = _controller(concurrency=1)
+    with pytest.raises(RuntimeError):
+        with controller.acquire('bulk', 'a', QueryCost(bytes_out=100)):
+            raise RuntimeError('view failed')
+
+    assert controller.get_status()['bulk']['active'] == 0
+    assert controller.get_status()['bulk']['active_bytes'] == 0
+    controller.acquire('bulk', 'a').release()
+
+
+def test_shed_response_carries_retry_after(small_data_path, monkeypatch):
+    monkeypatch.setattr(covid, 'covid_service', CovidService(small_data_path))
+    monkeypatch.setattr(covid, 'admission', _controller(client_limit=True, client_rate=0.5, client_burst=1.0))
+    client = create_app(warm_up=False).test_client()
+
+    assert client.get('/api/covid/all-records').status_code == 200
+    response = client.get('/api/covid/all-records')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+
+
+def test_client_id_header_separates_clients_behind_a_proxy(small_data_path, monkeypatch):
+    monkeypatch.setattr(covid, 'covid_service', CovidService(small_data_path))
+    monkeypatch.setattr(covid, 'admission', _controller(
+        client_limit=True, client_rate=0.5, client_burst=1.0, client_id_header='X-Forwarded-For'
+    ))
+    client = create_app(warm_up=False).test_client()
+
+    for user in ('10.0.0.1', '10.0.0.2'):
+        headers = {'X-Forwarded-For': f"spoofed, {user}"}
+        assert client.get('/api/covid/all-records', headers=headers).status_code == 200
+    headers = {'X-Forwarded-For': '10.0.0.1'}
+    assert client.get('/api/covid/all-records', headers=headers).status_code == 429
+
+
+def test_identical_bulk_requests_share_one_admission(small_data_path, monkeypatch):
+    service = CovidService(small_data_path)
+    controller = _controller(concurrency=1)
+    monkeypatch.setattr(covid, 'covid_service', service)
+    monkeypatch.setattr(covid, 'admission', controller)
+    app = create_app(warm_up=False)
+
+    started = threading.Event()
+    release = threading.Event()
+    real_query = service.get_all_records_no_pagination
+
+    def slow_query(**filters):
+        started.set()
+        release.wait(10)
+        return real_query(**filters)
+
+    monkeypatch.setattr(service, 'get_all_records_no_pagination', slow_query)
+
+    statuses = []
+
+    def fetch():
+        statuses.append(app.test_client().get('/api/covid/all-records?state=Ohio').status_code)
+
+    leader = threading.Thread(target=fetch)
+    leader.start()
+    started.wait(10)
+    followers = [threading.Thread(target=fetch) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Give the followers time to reach the in-flight request (or, without
+    # coalescing before admission, to be shed by the full bulk class)
+    for follower in followers:
+        follower.join(0.2)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(10)
+
+    assert statuses == [200] * 4
+    assert controller.get_status()['bulk']['active'] == 0
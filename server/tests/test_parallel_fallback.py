@@ -0,0 +1,61 @@
+"""A worker pool that fails to start leaves no partitions behind, and queries run serially."""
+import pytest
+
+from app.storage import MemoryBackend, PartitionedExecutor
+from app.storage import parallel
+
+
+@pytest.fixture
+def failing_pool(monkeypatch):
+    """Make the next worker pool construction fail, as when processes cannot be spawned"""
+    real_pool = parallel.ProcessPoolExecutor
+    calls = []
+
+    def pool(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('cannot start workers')
+        return real_pool(*args, **kwargs)
+
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor', pool)
+    return calls
+
+
+def test_failed_prepare_publishes_nothing_and_can_be_retried(small_data_path, failing_pool):
+    serial = MemoryBackend(small_data_path)
+    records = serial.data_parser.parse_data()
+    executor = PartitionedExecutor(2, 2, 0)
+    try:
+        with pytest.raises(OSError):
+            executor.prepare(records)
+        assert not executor.is_prepared()
+        assert executor._segments == [] and executor._shared == []
+
+        executor.prepare(records)
+        assert len(executor._segments) == 2
+        assert len(executor.positions(sex='male')) == len(serial.query(sex='male'))
+    finally:
+        executor.close()
+
+
+def test_load_falls_back_to_serial_when_the_pool_cannot_start(small_data_path, failing_pool):
+    executor = PartitionedExecutor(2, 2, 0)
+    backend = MemoryBackend(small_data_path, executor)
+    backend.load()
+    backend.load()
+
+    assert backend.executor is None
+    assert executor._shared == []
+    serial = MemoryBackend(small_data_path)
+    assert backend.query(sex='male') == serial.query(sex='male')
+    assert backend.search(sex='male', limit=5)[1] == serial.search(sex='male', limit=5)[1]
+
+
+def test_query_falls_back_to_serial_when_lazy_prepare_fails(small_data_path, failing_pool):
+    backend = MemoryBackend(small_data_path, PartitionedExecutor(2, 2, 0))
+    serial = MemoryBackend(small_data_path)
+
+    # No load(): the first query prepares the pool itself
+    assert backend.query(sex='male') == serial.query(sex='male')
+    assert backend.executor is None
+    assert backend.trends() == serial.trends()
@@ -0,0 +1,229 @@
+"""Every storage backend returns what a naive filter cascade over the records returns.
+
+The reference applies each filter as its own list comprehension, sorts with
+sorted() and aggregates with plain dictionaries, following the semantics
+documented on StorageBackend. Randomized filter combinations are checked
+against the in-memory engine, the SQLite backend and the partitioned
+parallel executor.
+"""
+import json
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from app.storage import MemoryBackend, PartitionedExecutor, SqliteBackend
+from app.storage.base import SORT_FIELDS
+from app.utils.covid_data_parser import INDEXED_FIELDS
+
+STATES = ['California', 'Colorado', 'New Mexico', 'New York', 'Ohio', 'OHIO', 'Oregon', '']
+SEASONS = ['2019-20', '2020-21', '2021-22', '2022-23', '']
+AGES = ['All', '0-4 years', '18-49 years', '65+ years', '≥75 years']
+SEXES = ['All', 'Male', 'Female']
+RACES = ['All', 'White', 'Black', 'Hispanic', 'Asian/Pacific Islander']
+# Unparseable months have no date and sort lowest
+YEAR_MONTHS = [f"{year}{month:02d}" for year in range(2019, 2024) for month in range(1, 13)] + ['', '2021']
+# Share of visible values exported as null
+NULL_FRACTION = 0.02
+
+ROWS = 3000
+QUERIES = 150
+
+
+def _write_dataset(path):
+    """A Socrata rows.json export: 8 hidden metadata columns, then the visible ones"""
+    rng = random.Random(7)
+    columns = [{'fieldName': f":meta{i}", 'flags': ['hidden']} for i in range(8)]
+    columns += [{'fieldName': name} for name in (
+        'state', 'season', '_yearmonth', 'agecategory_legend', 'sex_label', 'race_label', 'monthlyrate', 'type'
+    )]
+    rows = []
+    for i in range(ROWS):
+        rate = '' if rng.random() < 0.05 else f"{rng.uniform(0, 80):.1f}"
+        visible = [rng.choice(STATES), rng.choice(SEASONS), rng.choice(YEAR_MONTHS),
+                   rng.choice(AGES), rng.choice(SEXES), rng.choice(RACES), rate]
+        visible = [None if rng.random() < NULL_FRACTION else value for value in visible]
+        rows.append([f"row-{i}", 'x', 0, 0, None, 0, None, '{}', *visible, 'Crude Rate'])
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'meta': {'view': {'columns': columns}}, 'data': rows}, file)
+
+
+@pytest.fixture(scope='module')
+def data_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('data') / 'rows.json'
+    _write_dataset(path)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def records(data_path):
+    backend = MemoryBackend(data_path)
+    backend.load()
+    return backend.data_parser.parse_data()
+
+
+@pytest.fixture(scope='module', params=['memory', 'sqlite', 'parallel'])
+def backend(request, data_path, tmp_path_factory):
+    if request.param == 'sqlite':
+        backend = SqliteBackend(data_path, str(tmp_path_factory.mktemp('db') / 'rows.sqlite3'))
+    elif request.param == 'parallel':
+        # min_rows=0 sends every query through the worker pool
+        backend = MemoryBackend(data_path, PartitionedExecutor(2, 3, 0))
+    else:
+        backend = MemoryBackend(data_path)
+    backend.load()
+    yield backend
+    if getattr(backend, 'executor', None) is not None:
+        backend.executor.close()
+
+
+def reference_query(records, state=None, state_contains=None, season=None, age_category=None,
+                    sex=None, race=None, min_rate=None, max_rate=None, start_date=None, end_date=None):
+    result = records
+    for field, value in (('state', state), ('season', season), ('age_category', age_category),
+                         ('sex', sex), ('race', race)):
+        if value:
+            result = [r for r in result if r[field] and r[field].lower() == value.lower()]
+    # Unlike the other filters, an empty substring still drops records without a state
+    if state_contains is not None:
+        result = [r for r in result if r['state'] and state_contains.lower() in r['state'].lower()]
+    if min_rate is not None:
+        result = [r for r in result if r['monthly_rate'] is not None and r['monthly_rate'] >= min_rate]
+    if max_rate is not None:
+        result = [r for r in result if r['monthly_rate'] is not None and r['monthly_rate'] <= max_rate]
+    if start_date:
+        result = [r for r in result if r['date'] and r['date'] >= start_date]
+    if end_date:
+        result = [r for r in result if r['date'] and r['date'] <= end_date]
+    return result
+
+
+def reference_search(records, sort_by, sort_order, offset, limit, **filters):
+    field = SORT_FIELDS.get(sort_by, 'date')
+    if field == 'monthly_rate':
+        key = lambda r: r[field] if r[field] is not None else -1
+    else:
+        key = lambda r: r[field] or ''
+    matches = reference_query(records, **filters)
+    ordered = sorted(matches, key=key, reverse=sort_order == 'desc')
+    return ordered[offset:None if limit is None else offset + limit], len(matches)
+
+
+def reference_trends(records, **filters):
+    months = {}
+    for record in reference_query(records, **filters):
+        month = months.setdefault(record['year_month'], {
+            'year_month': record['year_month'], 'date': record['date'],
+            'formatted_date': record['formatted_date'], 'rates': []
+        })
+        if record['monthly_rate'] is not None:
+            month['rates'].append(record['monthly_rate'])
+
+    trends = []
+    for month in months.values():
+        rates = month.pop('rates')
+        month['count'] = len(rates)
+        month['avg_rate'] = sum(rates) / len(rates) if rates else 0
+        month['max_rate'] = max(rates, default=0)
+        month['min_rate'] = min(rates, default=0)
+        trends.append(month)
+    return sorted(trends, key=lambda month: month['date'] or '')
+
+
+def reference_facets(records, **filters):
+    facets = {}
+    for field in INDEXED_FIELDS:
+        counts = Counter(
+            r[field].lower() for r in reference_query(records, **{**filters, field: None}) if r[field]
+        )
+        values = sorted({r[field] for r in records if r[field]})
+        facets[field] = {value: counts[value.lower()] for value in values}
+    return {'total_records': len(reference_query(records, **filters)), 'facets': facets}
+
+
+def random_filters(rng):
+    filters = {}
+    for field, values in (('state', STATES + ['nowhere']), ('season', SEASONS), ('age_category', AGES),
+                          ('sex', SEXES), ('race', RACES)):
+        if rng.random() < 0.3:
+            value = rng.choice(values)
+            filters[field] = value.upper() if rng.random() < 0.3 else value
+    if rng.random() < 0.15:
+        filters['state_contains'] = rng.choice(['new', 'O', 'zz', ''])
+    if rng.random() < 0.3:
+        filters['min_rate'] = round(rng.uniform(0, 85), 1)
+    if rng.random() < 0.3:
+        filters['max_rate'] = round(rng.uniform(0, 85), 1)
+    if rng.random() < 0.3:
+        filters['start_date'] = f"{rng.randint(2019, 2024)}-{rng.randint(1, 12):02d}"
+    if rng.random() < 0.3:
+        filters['end_date'] = f"{rng.randint(2019, 2024)}-{rng.randint(1, 12):02d}-01T00:00:00"
+    return filters
+
+
+def filter_cases():
+    rng = random.Random(11)
+    return [{}] + [random_filters(rng) for _ in range(QUERIES)]
+
+
+def _ids(rows):
+    return [row['id'] for row in rows]
+
+
+def _assert_trends_equal(actual, expected):
+    assert [t['year_month'] for t in actual] == [t['year_month'] for t in expected]
+    for got, want in zip(actual, expected):
+        assert (got['date'], got['formatted_date'], got['count']) == \
+            (want['date'], want['formatted_date'], want['count'])
+        for statistic in ('avg_rate', 'max_rate', 'min_rate'):
+            assert math.isclose(got[statistic], want[statistic], rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_query(backend, records):
+    for filters in filter_cases():
+        assert _ids(backend.query(**filters)) == _ids(reference_query(records, **filters)), filters
+
+
+def test_query_returns_full_records(backend, records):
+    assert backend.query(state='ohio') == reference_query(records, state='ohio')
+
+
+def test_search(backend, records):
+    rng = random.Random(13)
+    for filters in filter_cases():
+        sort_by = rng.choice(list(SORT_FIELDS) + ['unknown'])
+        sort_order = rng.choice(['asc', 'desc'])
+        offset = rng.choice([0, 0, 7, 50, 5000, -3])
+        limit = rng.choice([None, 1, 20, 100])
+
+        rows, total = backend.search(sort_by, sort_order, offset, limit, **filters)
+        expected, expected_total = reference_search(records, sort_by, sort_order, offset, limit, **filters)
+        assert (_ids(rows), total) == (_ids(expected), expected_total), (filters, sort_by, sort_order, offset, limit)
+
+
+def test_trends(backend, records):
+    for filters in filter_cases():
+        _assert_trends_equal(backend.trends(**filters), reference_trends(records, **filters))
+
+
+def test_facets(backend, records):
+    for filters in filter_cases()[:40]:
+        assert backend.facets(**filters) == reference_facets(records, **filters), filters
+
+
+def test_state_summary(backend, records):
+    for state in ('Ohio', 'new york', 'nowhere'):
+        matches = reference_query(records, state=state)
+        summary = backend.state_summary(state)
+        if not matches:
+            assert summary is None
+            continue
+
+        rates = [r['monthly_rate'] for r in matches if r['monthly_rate'] is not None]
+        assert summary['total_records'] == len(matches)
+        # Records without a month count as one month of their own
+        assert summary['statistics']['total_months'] == len({r['year_month'] for r in matches})
+        assert math.isclose(summary['statistics']['avg_rate'], sum(rates) / len(rates))
+        assert summary['statistics']['max_rate'] == max(rates)
+        assert sorted(summary['seasons']) == sorted({r['season'] for r in matches if r['season']})
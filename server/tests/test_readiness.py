@@ -0,0 +1,51 @@
+"""Readiness follows the backend, and reports warming only while a warm-up is running."""
+import threading
+
+import pytest
+
+from app import create_app
+from app.routes import covid
+from app.services.covid_service import CovidService
+
+
+@pytest.fixture
+def client(small_data_path, monkeypatch):
+    service = CovidService(small_data_path)
+    monkeypatch.setattr(covid, 'covid_service', service)
+    app = create_app(warm_up=False)
+    return app.test_client(), service
+
+
+def test_without_warm_up_ready_once_the_data_is_loaded(client):
+    test_client, _ = client
+    assert test_client.get('/api/covid/ready').status_code == 503
+
+    assert test_client.get('/api/covid/search?state=Ohio').status_code == 200
+
+    assert test_client.get('/api/covid/ready').status_code == 200
+    assert test_client.get('/api/covid/health').status_code == 200
+
+
+def test_warming_while_the_warm_up_runs(client, monkeypatch):
+    test_client, service = client
+    caches_filled = threading.Event()
+    real_filter_options = service.get_filter_options
+
+    def slow_filter_options():
+        caches_filled.wait(10)
+        return real_filter_options()
+
+    monkeypatch.setattr(service, 'get_filter_options', slow_filter_options)
+    thread = service.start_warm_up()
+    # Loaded, but the warm-up has not filled the caches yet
+    while not service.backend.is_loaded():
+        thread.join(0.01)
+
+    response = test_client.get('/api/covid/ready')
+    assert response.status_code == 503
+    assert response.get_json()['phase'] == 'warming'
+
+    caches_filled.set()
+    thread.join(10)
+    assert test_client.get('/api/covid/ready').status_code == 200
+    assert test_client.get('/api/covid/health').status_code == 200
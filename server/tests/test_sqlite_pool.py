@@ -0,0 +1,34 @@
+"""SQLite read connections are pooled across request threads, not opened per thread."""
+import threading
+
+from app.storage import SqliteBackend
+
+
+def test_threads_reuse_pooled_connections(small_data_path, tmp_path, monkeypatch):
+    monkeypatch.setenv('COVID_SQLITE_POOL_SIZE', '2')
+    backend = SqliteBackend(small_data_path, str(tmp_path / 'rows.sqlite3'))
+    expected = backend.query(state='Ohio')
+    with backend._connection() as connection:
+        first = connection
+
+    results = []
+    for _ in range(5):
+        # A thread per request, as the development server runs them
+        thread = threading.Thread(target=lambda: results.append(backend.query(state='Ohio')))
+        thread.start()
+        thread.join()
+
+    assert results == [expected] * 5
+    assert backend._pool.qsize() == 1
+    with backend._connection() as connection:
+        assert connection is first
+
+
+def test_pool_keeps_at_most_pool_size_idle_connections(small_data_path, tmp_path, monkeypatch):
+    monkeypatch.setenv('COVID_SQLITE_POOL_SIZE', '2')
+    backend = SqliteBackend(small_data_path, str(tmp_path / 'rows.sqlite3'))
+    backend.load()
+
+    with backend._connection(), backend._connection(), backend._connection():
+        pass
+    assert backend._pool.qsize() == 2